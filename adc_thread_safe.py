@@ -1,5 +1,8 @@
+import datetime
 import threading
 
+import clock
+
 
 class Adc(object):
     """Thread-safe wrapper around an ADC object."""
@@ -21,4 +24,81 @@ class Adc(object):
             The value read from the given ADC channel (as a float).
         """
         with self._lock:
-            return self._adc.read_adc(adc_number)
\ No newline at end of file
+            return self._adc.read_adc(adc_number)
+
+    def read_many(self, channels):
+        """Read several ADC channels in one burst
+        The channels are read back to back under a single acquisition of the
+        lock, so no other thread's reads can interleave with them.
+        Args:
+            channels: ADC channels to read.
+        Returns:
+            A list of the values read, in the order of channels.
+        """
+        with self._lock:
+            return [self._adc.read_adc(channel) for channel in channels]
+
+
+class BurstSampler(object):
+    """Shares burst reads of a group of ADC channels between sensors.
+    Every burst reads all of the group's channels, so sensors that sample on
+    the same tick get their values from one burst instead of each taking the
+    ADC lock. Has the same read interface as Adc.
+    """
+
+    def __init__(self, adc, channels, utc_clock=None, max_age=None):
+        """Creates a new BurstSampler.
+        Args:
+            adc: Adc to read from.
+            channels: ADC channels to read in every burst.
+            utc_clock: Clock interface used to age readings. Defaults to a UTC
+                clock.
+            max_age: How old (as a timedelta) a burst's reading may be for
+                read_adc() to return it instead of starting a new burst.
+                Defaults to 2 seconds.
+        """
+        self._adc = adc
+        self._channels = list(channels)
+        self._clock = utc_clock or clock.Clock()
+        self._max_age = max_age or datetime.timedelta(seconds=2)
+        self._lock = threading.Lock()
+        self._readings = {}
+        self._read_time = None
+
+    def read_adc(self, adc_number):
+        """Read a value from the ADC, reusing a recent burst if there is one
+        Args:
+            adc_number: ADC channel to read.
+        Returns:
+            The value of the given ADC channel from a burst no older than
+            max_age.
+        """
+        with self._lock:
+            if (adc_number in self._readings and
+                    self._clock.now() - self._read_time <= self._max_age):
+                return self._readings[adc_number]
+            return self._burst([adc_number])[0]
+
+    def read_many(self, channels):
+        """Read several ADC channels in a new burst
+        Always reads the ADC, so it suits sensors that must read right after
+        a change, such as powering the sensor on. The other channels in the
+        group are read in the same burst for read_adc() to reuse.
+        Args:
+            channels: ADC channels to read.
+        Returns:
+            A list of the values read, in the order of channels.
+        """
+        with self._lock:
+            return self._burst(channels)
+
+    def _burst(self, channels):
+        # The requested channels come first and keep any repeats, so a
+        # sensor can oversample its channel within the burst.
+        burst_channels = list(channels) + [
+            channel for channel in self._channels if channel not in channels
+        ]
+        values = self._adc.read_many(burst_channels)
+        self._readings = dict(zip(burst_channels, values))
+        self._read_time = self._clock.now()
+        return values[:len(channels)]
@@ -0,0 +1,46 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Photos are skipped when the light level (in percent) is below this.
+_DEFAULT_MIN_LIGHT_LEVEL = 5.0
+_FILENAME_FORMAT = '%Y-%m-%dT%H%MZ.jpg'
+
+
+class CameraManager(object):
+    """Captures photos of the plant while there is light to see it by."""
+
+    def __init__(self, image_path, utc_clock, camera, light_sensor,
+                 min_light_level=_DEFAULT_MIN_LIGHT_LEVEL):
+        """Creates a new CameraManager.
+        Args:
+            image_path: Path to the folder in which to save photos.
+            utc_clock: A UTC clock interface, used to name photos.
+            camera: Camera interface, such as a picamera.PiCamera.
+            light_sensor: Light sensor interface.
+            min_light_level: Light level (in percent) below which photos are
+                skipped as too dark.
+        """
+        self._image_path = image_path
+        self._clock = utc_clock
+        self._camera = camera
+        self._light_sensor = light_sensor
+        self._min_light_level = min_light_level
+
+    def save_photo(self):
+        """Captures a photo, unless it is too dark.
+        Returns:
+            The path of the saved photo, or None if it was too dark.
+        """
+        light_level = self._light_sensor.light()
+        if light_level < self._min_light_level:
+            logger.info('too dark for a photo (light=%.1f%%)', light_level)
+            return None
+        if not os.path.isdir(self._image_path):
+            os.makedirs(self._image_path)
+        path = os.path.join(self._image_path,
+                            self._clock.now().strftime(_FILENAME_FORMAT))
+        self._camera.capture(path)
+        logger.info('saved photo to %s', path)
+        return path
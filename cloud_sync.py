@@ -0,0 +1,136 @@
+"""Uploads new rows from the gardenpi database to Firebase."""
+
+import logging
+import sqlite3
+import threading
+
+import firebase_rest
+import firebasedb
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of rows to upload in a single request.
+_DEFAULT_BATCH_SIZE = 500
+
+
+def _row_key(rowid, timestamp):
+    """Returns the Firebase key under which a row is stored.
+    The key only depends on the row, so uploading the same row twice writes
+    the same location twice instead of creating a duplicate.
+    """
+    return '%d-%d' % (timestamp, rowid)
+
+
+class SyncEngine(object):
+    """Uploads rows that are newer than each table's high-water mark.
+    Rows are uploaded in rowid order, batch_size rows per request, as one
+    multi-path PATCH under root_path/<table>/<key>. A table's high-water mark
+    only advances after the server accepts a batch, so an upload interrupted by
+    a crash or a network error is retried from the last accepted batch. Keys
+    are deterministic, which makes the retry idempotent.
+    """
+
+    def __init__(self, sync_state_store, client, root_path,
+                 batch_size=_DEFAULT_BATCH_SIZE):
+        """Creates a new SyncEngine.
+        Args:
+            sync_state_store: firebasedb.SyncStateStore for the database to
+                sync.
+            client: firebase_rest.FirebaseClient to upload rows with.
+            root_path: Database path under which to store each table.
+            batch_size: Maximum number of rows to upload per request.
+        """
+        self._sync_state_store = sync_state_store
+        self._client = client
+        self._root_path = root_path
+        self._batch_size = batch_size
+
+    def sync(self):
+        """Uploads every row that has not been uploaded yet.
+        Returns:
+            The number of rows uploaded.
+        Raises:
+            firebase_rest.Error if an upload failed. Batches accepted before
+            the failure stay synced.
+        """
+        uploaded = 0
+        for table in self._sync_state_store.tables():
+            uploaded += self._sync_table(table)
+        return uploaded
+
+    def _sync_table(self, table):
+        value_column = self._sync_state_store.value_column(table)
+        last_rowid = self._sync_state_store.high_water_mark(table)
+        uploaded = 0
+        while True:
+            rows = self._sync_state_store.rows_after(table, last_rowid,
+                                                     self._batch_size)
+            if not rows:
+                break
+            values = {}
+            for rowid, timestamp, value in rows:
+                values['%s/%s' % (table, _row_key(rowid, timestamp))] = {
+                    'timestamp': timestamp,
+                    value_column: value,
+                }
+            self._client.patch(self._root_path, values)
+            last_rowid = rows[-1][0]
+            self._sync_state_store.set_high_water_mark(table, last_rowid)
+            uploaded += len(rows)
+        if uploaded:
+            logger.info('synced %d row(s) from %s', uploaded, table)
+        return uploaded
+
+
+class SyncThread(object):
+    """Runs a SyncEngine periodically on a background thread.
+    The thread opens its own database connection, so syncing reads committed
+    rows without ever blocking the record processor's writes.
+    """
+
+    def __init__(self, connect_db, client, root_path, interval,
+                 batch_size=_DEFAULT_BATCH_SIZE):
+        """Creates a new SyncThread.
+        Args:
+            connect_db: Function that opens a new connection to the gardenpi
+                database. Called on the sync thread.
+            client: firebase_rest.FirebaseClient to upload rows with.
+            root_path: Database path under which to store each table.
+            interval: Amount of time (as a timedelta) between syncs.
+            batch_size: Maximum number of rows to upload per request.
+        """
+        self._connect_db = connect_db
+        self._client = client
+        self._root_path = root_path
+        self._interval_seconds = interval.total_seconds()
+        self._batch_size = batch_size
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start_async(self):
+        """Starts syncing on a background thread."""
+        self._thread = threading.Thread(target=self._run, name='cloud-sync')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """Stops syncing and waits for an in-progress sync to finish."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        connection = self._connect_db()
+        try:
+            engine = SyncEngine(firebasedb.SyncStateStore(connection),
+                                self._client, self._root_path,
+                                self._batch_size)
+            while True:
+                try:
+                    engine.sync()
+                except (firebase_rest.Error, sqlite3.Error) as e:
+                    logger.warning('cloud sync failed, will retry: %s', e)
+                if self._stop_event.wait(self._interval_seconds):
+                    break
+        finally:
+            connection.close()
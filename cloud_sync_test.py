@@ -0,0 +1,132 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+try:
+    import BaseHTTPServer
+except ImportError:
+    import http.server as BaseHTTPServer
+
+import pytz
+
+import cloud_sync
+import firebase_rest
+import firebasedb
+import storage_backend
+
+_ROOT_PATH = 'garden'
+
+
+class _StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Accepts every PATCH and records its path and body on the server."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_PATCH(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append(
+            (self.path, json.loads(body.decode('utf-8'))))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SyncEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0),
+                                                _StandInHandler)
+        self.server.requests = []
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        self.client = firebase_rest.FirebaseClient(
+            'http://127.0.0.1:%d' % self.server.server_address[1])
+
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, 'gardenpi.db')
+        self.backend = storage_backend.SqliteBackend()
+        self.connection = firebasedb.open_or_create_db(self.db_path,
+                                                       self.backend)
+        self.store = firebasedb.TemperatureStore(self.connection)
+        self.sync_connection = None
+        self.start = datetime.datetime(2020, 1, 1, tzinfo=pytz.utc)
+        self.inserted_count = 0
+
+    def tearDown(self):
+        if self.sync_connection:
+            self.sync_connection.close()
+        self.connection.close()
+        shutil.rmtree(self.directory)
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _insert_temperatures(self, count):
+        for _ in range(count):
+            self.store.insert(firebasedb.TemperatureRecord(
+                self.start + datetime.timedelta(minutes=self.inserted_count),
+                20.0 + self.inserted_count))
+            self.inserted_count += 1
+
+    def _start_engine(self, batch_size):
+        """Opens a new sync connection, as the sync thread does on start."""
+        if self.sync_connection:
+            self.sync_connection.close()
+        self.sync_connection = self.backend.connect(self.db_path)
+        return cloud_sync.SyncEngine(
+            firebasedb.SyncStateStore(self.sync_connection), self.client,
+            _ROOT_PATH, batch_size)
+
+    def _uploaded_temperatures(self):
+        """Returns the temperatures uploaded by each request, in order."""
+        uploads = []
+        for path, values in self.server.requests:
+            self.assertEqual('/%s.json' % _ROOT_PATH, path)
+            uploads.append(sorted(value['temperature']
+                                  for key, value in values.items()
+                                  if key.startswith('temperature/')))
+        return [upload for upload in uploads if upload]
+
+    def test_uploads_in_batches(self):
+        self._insert_temperatures(7)
+
+        self.assertEqual(7, self._start_engine(batch_size=3).sync())
+        self.assertEqual([[20.0, 21.0, 22.0], [23.0, 24.0, 25.0], [26.0]],
+                         self._uploaded_temperatures())
+
+    def test_resumes_from_high_water_mark_after_restart(self):
+        self._insert_temperatures(4)
+        self.assertEqual(4, self._start_engine(batch_size=10).sync())
+        self._insert_temperatures(3)
+
+        self.assertEqual(3, self._start_engine(batch_size=10).sync())
+        self.assertEqual([[20.0, 21.0, 22.0, 23.0], [24.0, 25.0, 26.0]],
+                         self._uploaded_temperatures())
+        self.assertEqual(0, self._start_engine(batch_size=10).sync())
+
+    def test_resets_high_water_mark_when_table_was_emptied(self):
+        self._insert_temperatures(3)
+        engine = self._start_engine(batch_size=10)
+        self.assertEqual(3, engine.sync())
+        # Retention empties the table, so new rows reuse rowids at or below
+        # the high-water mark.
+        self.connection.execute('DELETE FROM temperature')
+        self.connection.commit()
+        self._insert_temperatures(2)
+
+        self.assertEqual(2, engine.sync())
+        self.assertEqual([[20.0, 21.0, 22.0], [23.0, 24.0]],
+                         self._uploaded_temperatures())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,43 +2,181 @@ import datetime
 import logging
 import threading
 
-
-import gpi.Gardenpi.db_store as db_store
+import firebasedb as db_store
 
 logger = logging.getLogger(__name__)
 
 _SECONDS_PER_MINUTE = 60
-# Number of seconds to idle between checks for whether a poller needs to poll or
-# a poller needs to stop (note that this is NOT the total time a poller sleeps
-# between polls).
-_IDLE_SECONDS = 0.5
-
-class piDataBus(object):
-"""
-Databus objects
-"""
-    def __init__(self, schedule_function, record_buff):
+
+
+class Scheduler(object):
+    """Decides when a databus reads its sensor next.
+    Reads happen on multiples of the interval since the Unix epoch, so
+    databuses with the same interval read on the same tick.
+    """
+
+    def __init__(self, utc_clock, interval):
+        """Creates a new Scheduler.
+        Args:
+            utc_clock: A UTC clock interface.
+            interval: Amount of time (as a timedelta) between reads.
         """
-        creates a new Sensor databus instance
-        :param self:
-        :param Schedule_Function: databus waiting function
-        :param record_buff: buffer for data records
-        :return:
+        self._clock = utc_clock
+        self._interval_seconds = interval.total_seconds()
+
+    def seconds_until_next_read(self):
+        """Returns the number of seconds until the next tick."""
+        now = self._clock.now()
+        elapsed = (now - db_store._EPOCH_UTC).total_seconds()
+        return self._interval_seconds - (elapsed % self._interval_seconds)
+
+    def timestamp(self):
+        """Returns the current time, for stamping records."""
+        return self._clock.now()
+
+
+class _DatabusBase(object):
+    """Base class for a databus, which reads a sensor on a schedule.
+    Subclasses implement _read_once().
+    """
+
+    def __init__(self, scheduler, record_queue):
+        """Creates a new databus.
+        Args:
+            scheduler: Scheduler that decides when to read.
+            record_queue: Queue on which to put records, or None if the
+                databus produces no records.
+        """
+        self._scheduler = scheduler
+        self._record_queue = record_queue
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start_databusing_async(self):
+        """Starts reading the sensor on a background thread."""
+        self._thread = threading.Thread(target=self._run,
+                                        name=type(self).__name__)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """Stops reading and waits for an in-progress read to finish."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop_event.wait(
+                self._scheduler.seconds_until_next_read()):
+            try:
+                self._read_once()
+            except Exception:
+                logger.exception('%s failed to read its sensor',
+                                 type(self).__name__)
+
+    def _read_once(self):
+        raise NotImplementedError()
+
+
+class _TemperatureDatabus(_DatabusBase):
+
+    def __init__(self, scheduler, record_queue, temperature_sensor):
+        super(_TemperatureDatabus, self).__init__(scheduler, record_queue)
+        self._temperature_sensor = temperature_sensor
+
+    def _read_once(self):
+        self._record_queue.put(
+            db_store.TemperatureRecord(self._scheduler.timestamp(),
+                                       self._temperature_sensor.temperature()))
+
+
+class _HumidityDatabus(_DatabusBase):
+
+    def __init__(self, scheduler, record_queue, humidity_sensor):
+        super(_HumidityDatabus, self).__init__(scheduler, record_queue)
+        self._humidity_sensor = humidity_sensor
+
+    def _read_once(self):
+        self._record_queue.put(
+            db_store.HumidityRecord(self._scheduler.timestamp(),
+                                    self._humidity_sensor.humidity()))
+
+
+class _SoilWateringDatabus(_DatabusBase):
+    """Reads soil moisture and waters the plant if it needs it."""
+
+    def __init__(self, scheduler, record_queue, soil_moisture_sensor,
+                 solenoid_manager):
+        super(_SoilWateringDatabus, self).__init__(scheduler, record_queue)
+        self._soil_moisture_sensor = soil_moisture_sensor
+        self._solenoid_manager = solenoid_manager
+
+    def _read_once(self):
+        soil_moisture = self._soil_moisture_sensor.soil_moisture()
+        self._record_queue.put(
+            db_store.SoilMoistureRecord(self._scheduler.timestamp(),
+                                        soil_moisture))
+        water_released = self._solenoid_manager.solenoid_if_needed(
+            soil_moisture)
+        if water_released:
+            self._record_queue.put(
+                db_store.WateringEventRecord(self._scheduler.timestamp(),
+                                             water_released))
+
+
+class _LightDatabus(_DatabusBase):
+
+    def __init__(self, scheduler, record_queue, light_sensor):
+        super(_LightDatabus, self).__init__(scheduler, record_queue)
+        self._light_sensor = light_sensor
+
+    def _read_once(self):
+        self._record_queue.put(
+            db_store.LightRecord(self._scheduler.timestamp(),
+                                 self._light_sensor.light()))
+
+
+class _CameraDatabus(_DatabusBase):
+    """Captures photos. Produces no records."""
+
+    def __init__(self, scheduler, record_queue, camera_manager):
+        super(_CameraDatabus, self).__init__(scheduler, record_queue)
+        self._camera_manager = camera_manager
+
+    def _read_once(self):
+        self._camera_manager.save_photo()
+
+
+class SensordatabusFactory(object):
+    """Creates a databus for each kind of gardenpi sensor."""
+
+    def __init__(self, make_scheduler_func, record_queue):
+        """Creates a new SensordatabusFactory.
+        Args:
+            make_scheduler_func: Function that creates a new Scheduler.
+            record_queue: Queue on which databuses put their records.
         """
-        self._schedule_function = schedule_function
-        self._record_buff = record_buff
-
-    def inc_temperature_databus(self, temperature_sensor):
-        return _sensorData(
-            _tempatureData(self._schedule_function(),
-                           self.record_buff, temperature_sensor))
-
-
-    def inc_humidity_databus(self, humidity_sensor):
-        return _sensorData(
-            _humidityData(self._schedule_function(),
-                           self.record_buff, humidity_sensor))
-    def soil_water_databus():
-        pass
-    def camera_databus():
-        pass
+        self._make_scheduler_func = make_scheduler_func
+        self._record_queue = record_queue
+
+    def create_temperature_databus(self, temperature_sensor):
+        return _TemperatureDatabus(self._make_scheduler_func(),
+                                   self._record_queue, temperature_sensor)
+
+    def create_humidity_databus(self, humidity_sensor):
+        return _HumidityDatabus(self._make_scheduler_func(),
+                                self._record_queue, humidity_sensor)
+
+    def create_soil_watering_databus(self, soil_moisture_sensor,
+                                     solenoid_manager):
+        return _SoilWateringDatabus(self._make_scheduler_func(),
+                                    self._record_queue, soil_moisture_sensor,
+                                    solenoid_manager)
+
+    def create_light_databus(self, light_sensor):
+        return _LightDatabus(self._make_scheduler_func(), self._record_queue,
+                             light_sensor)
+
+    def create_camera_databus(self, camera_manager):
+        return _CameraDatabus(self._make_scheduler_func(), self._record_queue,
+                              camera_manager)
@@ -0,0 +1,225 @@
+"""Minimal client for the Firebase Realtime Database REST API."""
+
+import collections
+import json
+import logging
+import threading
+
+try:
+    import httplib
+except ImportError:
+    import http.client as httplib
+try:
+    import urlparse
+    from urllib import urlencode
+except ImportError:
+    import urllib.parse as urlparse
+    from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+# Number of seconds to wait for the server before giving up on a request.
+_DEFAULT_TIMEOUT_SECONDS = 30.0
+# Maximum number of connections to keep open to the server.
+_DEFAULT_POOL_SIZE = 2
+
+# Methods that may be resent if a reused connection turns out to be stale.
+# POST is not idempotent: a resend could store the value twice.
+_IDEMPOTENT_METHODS = ('GET', 'PUT', 'PATCH', 'DELETE')
+
+
+class Error(Exception):
+    pass
+
+
+class RequestError(Error):
+    """A request failed, either in transit or with an error status.
+    Attributes:
+        status: HTTP status of the response, or None if no response arrived.
+    """
+
+    def __init__(self, message, status=None):
+        super(RequestError, self).__init__(message)
+        self.status = status
+
+
+class _ConnectionPool(object):
+    """A bounded pool of keep-alive connections to one server.
+    Connections stay open between requests, so only the first request on each
+    pays for the TCP and TLS handshakes. At most size connections exist at a
+    time; acquire() blocks while all of them are in use.
+    """
+
+    def __init__(self, make_connection, size):
+        if size < 1:
+            raise ValueError('pool size must be positive: %d' % size)
+        self._make_connection = make_connection
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = collections.deque()
+
+    def acquire(self):
+        """Returns an idle connection, or a new one if none is idle.
+        Returns:
+            A (connection, reused) tuple, where reused is True if the
+            connection has carried a request before.
+        """
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                # Most recently used first: it is the least likely to have
+                # been closed by the server for idling.
+                return self._idle.pop(), True
+        try:
+            return self._make_connection(), False
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection):
+        """Returns a healthy connection to the pool for reuse."""
+        with self._lock:
+            self._idle.append(connection)
+        self._slots.release()
+
+    def discard(self, connection):
+        """Closes a connection that must not be reused."""
+        try:
+            connection.close()
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Closes every idle connection."""
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+
+
+class FirebaseClient(object):
+    """Sends reads and writes to a Firebase Realtime Database over REST.
+    Paths are relative to the database root, such as
+    'raspberry-pi-2/sensors'. Values are anything json can encode.
+    Requests reuse a small pool of keep-alive connections, so over a slow or
+    metered link most requests skip the TCP and TLS handshakes. The client is
+    safe to share between threads.
+    """
+
+    def __init__(self, database_url, auth_token=None,
+                 timeout=_DEFAULT_TIMEOUT_SECONDS,
+                 pool_size=_DEFAULT_POOL_SIZE):
+        """Creates a new FirebaseClient.
+        Args:
+            database_url: Root URL of the database, such as
+                'https://<project>.firebaseio.com'. An http:// URL may be
+                used to talk to a local stand-in server.
+            auth_token: Database secret or ID token to send with every
+                request, or None for an unauthenticated database.
+            timeout: Number of seconds to wait for the server before a
+                request fails.
+            pool_size: Maximum number of connections to keep open, which is
+                also the maximum number of concurrent requests.
+        """
+        url = urlparse.urlsplit(database_url)
+        if url.scheme not in ('http', 'https'):
+            raise ValueError('Unsupported database URL: %s' % database_url)
+        self._scheme = url.scheme
+        self._netloc = url.netloc
+        self._base_path = url.path.rstrip('/')
+        self._auth_token = auth_token
+        self._timeout = timeout
+        self._pool = _ConnectionPool(self._connect, pool_size)
+
+    def patch(self, path, values):
+        """Updates the children of a path without replacing its other children.
+        Keys of values may themselves be slash-separated paths, which writes
+        several locations under path in one atomic request.
+        Args:
+            path: Database path to update.
+            values: A dict that maps child paths to their new values.
+        Returns:
+            The decoded response body.
+        Raises:
+            RequestError if the request failed.
+        """
+        return self._request('PATCH', path, values)
+
+    def put(self, path, value):
+        """Replaces the value at a path.
+        Raises:
+            RequestError if the request failed.
+        """
+        return self._request('PUT', path, value)
+
+    def post(self, path, value):
+        """Appends a value under a path with a server-generated key.
+        Returns:
+            The decoded response body, which holds the new key as 'name'.
+        Raises:
+            RequestError if the request failed.
+        """
+        return self._request('POST', path, value)
+
+    def get(self, path):
+        """Reads the value at a path.
+        Raises:
+            RequestError if the request failed.
+        """
+        return self._request('GET', path)
+
+    def close(self):
+        """Closes the client's idle connections."""
+        self._pool.close()
+
+    def _url_path(self, path):
+        url_path = '%s/%s.json' % (self._base_path, path.strip('/'))
+        if self._auth_token:
+            url_path += '?' + urlencode({'auth': self._auth_token})
+        return url_path
+
+    def _connect(self):
+        if self._scheme == 'https':
+            return httplib.HTTPSConnection(self._netloc, timeout=self._timeout)
+        return httplib.HTTPConnection(self._netloc, timeout=self._timeout)
+
+    def _request(self, method, path, value=None):
+        body = None
+        headers = {}
+        if value is not None:
+            body = json.dumps(value, separators=(',', ':')).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        url_path = self._url_path(path)
+        while True:
+            connection, reused = self._pool.acquire()
+            try:
+                connection.request(method, url_path, body, headers)
+                response = connection.getresponse()
+                response_body = response.read()
+            except (httplib.HTTPException, IOError) as e:
+                self._pool.discard(connection)
+                # The server may have closed an idle keep-alive connection
+                # before the request reached it, so try a fresh one.
+                if reused and method in _IDEMPOTENT_METHODS:
+                    logger.debug('retrying %s %s on a new connection: %s',
+                                 method, path, e)
+                    continue
+                raise RequestError('%s %s failed: %s' % (method, path, e))
+            except BaseException:
+                # Anything else, even KeyboardInterrupt, must still return
+                # the connection's slot, or the pool runs out of them.
+                self._pool.discard(connection)
+                raise
+            if response.will_close:
+                self._pool.discard(connection)
+            else:
+                self._pool.release(connection)
+            break
+        if response.status >= 300:
+            raise RequestError('%s %s failed with status %d: %s' %
+                               (method, path, response.status,
+                                response_body[:200]), response.status)
+        logger.debug('%s %s: %d byte(s) sent', method, path,
+                     len(body) if body else 0)
+        if not response_body:
+            return None
+        return json.loads(response_body.decode('utf-8'))
@@ -0,0 +1,79 @@
+import threading
+import unittest
+
+import firebase_rest
+
+
+class _Response(object):
+    status = 200
+    will_close = False
+
+    def read(self):
+        return b'{"ok":true}'
+
+
+class _Connection(object):
+    """Connection whose first requests raise a given exception."""
+
+    def __init__(self, errors):
+        self._errors = errors
+
+    def request(self, method, url, body, headers):
+        if self._errors:
+            raise self._errors.pop(0)
+
+    def getresponse(self):
+        return _Response()
+
+    def close(self):
+        pass
+
+
+class FirebaseClientTest(unittest.TestCase):
+
+    def _make_client(self, errors, pool_size=2):
+        client = firebase_rest.FirebaseClient('http://localhost:1',
+                                              pool_size=pool_size)
+        client._connect = lambda: _Connection(errors)
+        client._pool = firebase_rest._ConnectionPool(client._connect,
+                                                     pool_size)
+        return client
+
+    def _get_with_deadline(self, client):
+        """Returns what a GET returns or raises, or fails if it never
+        finishes because the pool ran out of connection slots.
+        """
+        outcome = []
+
+        def get():
+            try:
+                outcome.append(client.get('path'))
+            except BaseException as e:
+                outcome.append(e)
+
+        thread = threading.Thread(target=get)
+        thread.daemon = True
+        thread.start()
+        thread.join(5.0)
+        self.assertFalse(thread.is_alive(), 'pool ran out of connections')
+        return outcome[0]
+
+    def test_unexpected_errors_return_connection_slots(self):
+        errors = [ValueError('unexpected')] * 3 + [KeyboardInterrupt()] * 3
+        client = self._make_client(errors)
+        for _ in range(3):
+            self.assertIsInstance(self._get_with_deadline(client), ValueError)
+        for _ in range(3):
+            self.assertIsInstance(self._get_with_deadline(client),
+                                  KeyboardInterrupt)
+        self.assertEqual({'ok': True}, self._get_with_deadline(client))
+
+    def test_io_errors_raise_request_error(self):
+        client = self._make_client([IOError('reset')])
+        self.assertIsInstance(self._get_with_deadline(client),
+                              firebase_rest.RequestError)
+        self.assertEqual({'ok': True}, self._get_with_deadline(client))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,18 @@
+import calendar
 import collections
+import contextlib
 import datetime
 import logging
-import os
-from firebase import firebase
 
 import pytz
-firebase = firebase.FirebaseApplication('https://console.firebase.google.com/project/garden-data-827b1/database/garden-data-827b1-default-rtdb/data/~2F')
+
+import clock
+import storage_backend
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 logger = logging.getLogger(__name__)
 
@@ -13,140 +20,565 @@ logger = logging.getLogger(__name__)
 # or event.
 SoilMoistureRecord = collections.namedtuple('SoilMoistureRecord',
                                             ['timestamp', 'soil_moisture'])
-#LightRecord = collections.namedtuple('LightRecord', ['timestamp', 'light'])
-#HumidityRecord = collections.namedtuple('HumidityRecord',
- #                                       ['timestamp', 'humidity'])
+LightRecord = collections.namedtuple('LightRecord', ['timestamp', 'light'])
+HumidityRecord = collections.namedtuple('HumidityRecord',
+                                        ['timestamp', 'humidity'])
 # temperature value is in degrees Celsius.
-#TemperatureRecord = collections.namedtuple('TemperatureRecord',
-  #                                         ['timestamp', 'temperature'])
+TemperatureRecord = collections.namedtuple('TemperatureRecord',
+                                           ['timestamp', 'temperature'])
 # water_released is the time of water released in ms.
 WateringEventRecord = collections.namedtuple('WateringEventRecord',
                                              ['timestamp', 'water_released'])
+# Summary of the readings in one rollup bucket. timestamp is the start of the
+# bucket, count the number of readings, and minimum, maximum and mean are
+# computed over the reading values.
+RollupRecord = collections.namedtuple(
+    'RollupRecord', ['timestamp', 'count', 'minimum', 'maximum', 'mean'])
+
+# Rollup resolutions accepted by get_rollup().
+HOURLY = 'hourly'
+DAILY = 'daily'
+
+# Version of the gardenpi schema, stored in the database's user_version.
+# Version 0 stored timestamps as YYYY-MM-DDTHH:MMZ text. Version 1 stores them
+# as integer seconds since the Unix epoch (UTC) and indexes them. Version 2
+# adds hourly and daily rollup tables for each sensor table. Version 3 adds the
+# sync_state table, which records how far each table has been synced.
+_SCHEMA_VERSION = 3
+
+# Maps each data table to the name of its value column.
+_TABLE_VALUE_COLUMNS = collections.OrderedDict([
+    ('temperature', 'temperature'),
+    ('humidity', 'humidity'),
+    ('soil_moisture', 'soil_moisture'),
+    ('light', 'light'),
+    ('watering_events', 'water_released'),
+])
+
+# Sensor tables that have rollup tables.
+_ROLLUP_SOURCE_TABLES = ['temperature', 'humidity', 'soil_moisture', 'light']
+
+# Maps each rollup resolution to the width of its buckets, in seconds. Daily
+# buckets start at midnight UTC.
+_ROLLUP_BUCKET_SECONDS = collections.OrderedDict([
+    (HOURLY, 60 * 60),
+    (DAILY, 24 * 60 * 60),
+])
 
 # firebase statements to create database tables. Each statement is separated by a
-# semicolon and newline.
+# semicolon and newline. Timestamps are seconds since the Unix epoch (UTC).
 _CREATE_TABLE_COMMANDS = """
 CREATE TABLE temperature
 (
-    timestamp TEXT,
+    timestamp INTEGER,
     temperature REAL    --temperature (in degrees Celsius)
 );
+CREATE INDEX temperature_timestamp ON temperature (timestamp);
 CREATE TABLE humidity
 (
-    timestamp TEXT,
+    timestamp INTEGER,
     humidity REAL
 );
+CREATE INDEX humidity_timestamp ON humidity (timestamp);
 CREATE TABLE soil_moisture
 (
-    timestamp TEXT,
+    timestamp INTEGER,
     soil_moisture INTEGER
 );
+CREATE INDEX soil_moisture_timestamp ON soil_moisture (timestamp);
 CREATE TABLE light
 (
-    timestamp TEXT,
+    timestamp INTEGER,
     light REAL
 );
+CREATE INDEX light_timestamp ON light (timestamp);
 CREATE TABLE watering_events
 (
-    timestamp TEXT,
+    timestamp INTEGER,
     water_released REAL   --amount of water released (in ms)
 );
+CREATE INDEX watering_events_timestamp ON watering_events (timestamp);
+"""
+
+# firebase statement to create a rollup table, formatted with the sensor table
+# name and the rollup resolution. Each row summarizes the readings in one
+# bucket; timestamp is the start of the bucket in seconds since the Unix epoch.
+_CREATE_ROLLUP_TABLE_COMMAND = """
+CREATE TABLE %s_%s
+(
+    timestamp INTEGER PRIMARY KEY,
+    count INTEGER,
+    total REAL,
+    minimum REAL,
+    maximum REAL
+)
+"""
+
+# firebase statement to create the table that holds each data table's sync
+# high-water mark: the largest rowid already uploaded to the cloud.
+_CREATE_SYNC_STATE_TABLE_COMMAND = """
+CREATE TABLE sync_state
+(
+    source_table TEXT PRIMARY KEY,
+    last_rowid INTEGER
+)
+"""
+
+# firebase statements to fold readings into their rollup buckets, formatted
+# with the rollup table name. The first creates any missing bucket empty and
+# the second folds one reading into its bucket. Upsert needs SQLite 3.24, which
+# Raspbian releases before Buster do not ship, so the two steps are separate.
+# Every new bucket is created before any reading is folded in, so readings
+# that share a new bucket within one batch are all counted.
+_CREATE_ROLLUP_BUCKET_COMMAND = """
+INSERT OR IGNORE INTO %s VALUES (?, 0, 0.0, ?, ?)
+"""
+_UPDATE_ROLLUP_COMMAND = """
+UPDATE %s SET
+    count = count + 1,
+    total = total + ?,
+    minimum = MIN(minimum, ?),
+    maximum = MAX(maximum, ?)
+WHERE timestamp = ?
 """
 
-# Format to store timestamps to database (assumes timestamp is in UTC) in format
-# of YYYY-MM-DDTHH:MMZ.
-_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%MZ'
+
+# Number of rows to fetch from the database at a time when streaming records.
+_FETCH_CHUNK_SIZE = 256
+# Number of rows to fetch from the database at a time when building arrays.
+_NUMPY_CHUNK_SIZE = 65536
 
 
 def _timestamp_to_utc(timestamp):
     return timestamp.replace(tzinfo=timestamp.tzinfo).astimezone(pytz.utc)
 
 
-def _open_db(db_path):
+def _timestamp_to_epoch(timestamp):
+    """Converts a datetime to integer seconds since the Unix epoch (UTC)."""
+    return calendar.timegm(_timestamp_to_utc(timestamp).utctimetuple())
+
+
+# Start of the Unix epoch, as a UTC datetime.
+_EPOCH_UTC = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+
+def _epoch_to_timestamp(epoch_seconds):
+    """Converts seconds since the Unix epoch to a UTC datetime.
+    Adding a timedelta to a fixed aware datetime never calls into the tzinfo,
+    which makes this several times cheaper per row than fromtimestamp() with
+    pytz or parsing a string with strptime().
+    """
+    return _EPOCH_UTC + datetime.timedelta(0, epoch_seconds)
+
+
+def _range_query(firebase, start, end):
+    """Restricts a select query to a timestamp range and orders it by time.
+    Args:
+        firebase: firebase select query string without any WHERE clause.
+        start: If not None, only rows at or after this datetime are selected.
+        end: If not None, only rows before this datetime are selected.
+    Returns:
+        A (query, parameters) tuple to pass to cursor.execute().
+    """
+    conditions = []
+    parameters = []
+    if start is not None:
+        conditions.append('timestamp >= ?')
+        parameters.append(_timestamp_to_epoch(start))
+    if end is not None:
+        conditions.append('timestamp < ?')
+        parameters.append(_timestamp_to_epoch(end))
+    if conditions:
+        firebase += ' WHERE ' + ' AND '.join(conditions)
+    return firebase + ' ORDER BY timestamp', parameters
+
+
+def _open_db(db_path, backend):
     logger.info('opening existing gardenpi database at "%s"', db_path)
-    return firebase.connect(db_path)
+    return backend.connect(db_path)
+
+
+def _create_tables(cursor):
+    """Creates gardenpi's data tables and indexes using the given cursor."""
+    for firebase_command in _CREATE_TABLE_COMMANDS.split(';\n'):
+        cursor.execute(firebase_command)
+
+
+def _rollup_table(table, resolution):
+    return '%s_%s' % (table, resolution)
 
 
-def _create_db(db_path):
+def _create_rollup_tables(cursor):
+    """Creates the rollup tables for every sensor table."""
+    for table in _ROLLUP_SOURCE_TABLES:
+        for resolution in _ROLLUP_BUCKET_SECONDS:
+            cursor.execute(_CREATE_ROLLUP_TABLE_COMMAND % (table, resolution))
+
+
+def _backfill_rollup_tables(cursor):
+    """Rebuilds every rollup table from the readings in its sensor table."""
+    for table in _ROLLUP_SOURCE_TABLES:
+        value_column = _TABLE_VALUE_COLUMNS[table]
+        for resolution, bucket_seconds in _ROLLUP_BUCKET_SECONDS.items():
+            cursor.execute('DELETE FROM %s' % _rollup_table(table, resolution))
+            cursor.execute(
+                'INSERT INTO %s '
+                'SELECT timestamp - timestamp %% %d AS bucket, COUNT(*), '
+                'SUM(%s), MIN(%s), MAX(%s) FROM %s GROUP BY bucket' %
+                (_rollup_table(table, resolution), bucket_seconds,
+                 value_column, value_column, value_column, table))
+
+
+@contextlib.contextmanager
+def _ddl_transaction(connection):
+    """Runs a with block of schema changes as a single transaction.
+    The sqlite3 module commits any open transaction before DDL statements
+    when it manages transactions itself (always on Python 2), so the block
+    runs with that turned off and its own BEGIN, COMMIT and ROLLBACK.
+    Args:
+        connection: sqlite3 connection to change the schema of.
+    Yields:
+        A cursor on the connection.
+    """
+    isolation_level = connection.isolation_level
+    connection.isolation_level = None
+    cursor = connection.cursor()
+    try:
+        cursor.execute('BEGIN')
+        try:
+            yield cursor
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        cursor.execute('COMMIT')
+    finally:
+        cursor.close()
+        connection.isolation_level = isolation_level
+
+
+def _create_db(db_path, backend):
     """Creates and initializes a firebase database with a gardenpi schema.
     Creates a firebase database at the path specified and creates gardenpi's
     data tables within the database.
     Args:
         db_path: Path to where to create database file.
+        backend: Storage backend in which to create the database.
     Returns:
         A firebase connection object for the database. The caller is responsible
         for closing the object.
     """
     logger.info('creating new gardenpi database at "%s"', db_path)
-    firebase_commands = _CREATE_TABLE_COMMANDS.split(';\n')
-    connection = _open_db(db_path)
-    cursor = connection.cursor()
-    for firebase_command in firebase_commands:
-        cursor.execute(firebase_command)
-    connection.commit()
+    connection = _open_db(db_path, backend)
+    with _ddl_transaction(connection) as cursor:
+        _create_tables(cursor)
+        _create_rollup_tables(cursor)
+        cursor.execute(_CREATE_SYNC_STATE_TABLE_COMMAND)
+        cursor.execute('PRAGMA user_version = %d' % _SCHEMA_VERSION)
     return connection
 
 
-def open_or_create_db(db_path):
+def _migrate_db(connection):
+    """Upgrades a database in place to the current gardenpi schema.
+    Version 0 databases are rebuilt table by table, converting their text
+    timestamps to epoch seconds. Version 1 databases get rollup tables,
+    filled from their existing readings. Version 2 databases get an empty
+    sync_state table, so their whole history is synced. The migration runs in
+    a single transaction, so an interrupted migration leaves the database
+    unchanged.
+    Args:
+        connection: firebase connection to the database to upgrade.
+    """
+    cursor = connection.cursor()
+    cursor.execute('PRAGMA user_version')
+    version = cursor.fetchone()[0]
+    if version >= _SCHEMA_VERSION:
+        return
+    logger.info('migrating gardenpi database from schema version %d to %d',
+                version, _SCHEMA_VERSION)
+    cursor.close()
+    with _ddl_transaction(connection) as cursor:
+        if version < 1:
+            for table in _TABLE_VALUE_COLUMNS:
+                cursor.execute('ALTER TABLE %s RENAME TO %s_v0' %
+                               (table, table))
+            _create_tables(cursor)
+            for table, value_column in _TABLE_VALUE_COLUMNS.items():
+                cursor.execute(
+                    'INSERT INTO %s '
+                    "SELECT CAST(strftime('%%s', timestamp) AS INTEGER), %s "
+                    'FROM %s_v0' % (table, value_column, table))
+                cursor.execute('DROP TABLE %s_v0' % table)
+        if version < 2:
+            _create_rollup_tables(cursor)
+            _backfill_rollup_tables(cursor)
+        if version < 3:
+            cursor.execute(_CREATE_SYNC_STATE_TABLE_COMMAND)
+        cursor.execute('PRAGMA user_version = %d' % _SCHEMA_VERSION)
+
+
+def open_or_create_db(db_path, backend=None):
     """Opens a database file or creates one if the file does not exist.
     If a file exists at the given path, opens the file at that path as a
-    database and returns a connection to it. If no file exists, creates and
-    initializes a gardenpi database at the given file path.
+    database, migrates it to the current schema if needed, and returns a
+    connection to it. If no file exists, creates and initializes a gardenpi
+    database at the given file path.
+    Args:
+        db_path: Path to the database file.
+        backend: Storage backend that holds the database. Defaults to a local
+            SQLite file in WAL mode.
     Returns:
         A firebase connection object for the database. The caller is responsible
         for closing the object.
     """
-    if os.path.exists(db_path):
-        return _open_db(db_path)
+    backend = backend or storage_backend.SqliteBackend()
+    if backend.exists(db_path):
+        connection = _open_db(db_path, backend)
+        try:
+            _migrate_db(connection)
+        except BaseException:
+            connection.close()
+            raise
+        return connection
     else:
-        return _create_db(db_path)
+        return _create_db(db_path, backend)
 
 
 class _DbStoreBase(object):
-    """Base class for storing information in a database."""
+    """Base class for storing information in a database.
+    Inserts are group-committed: rows are written to the connection as they
+    arrive, but the transaction is only committed once commit_batch_size rows
+    are pending or commit_interval has elapsed since the first pending row,
+    whichever comes first. Callers must call flush() before closing the
+    connection so that no pending rows are lost.
+    """
 
-    def __init__(self, connection):
+    def __init__(self, connection, commit_batch_size=1, commit_interval=None,
+                 commit_clock=None):
         """Creates a new _DbStoreBase object for storing information.
         Args:
             connection: firebase database connection.
+            commit_batch_size: Maximum number of rows to buffer in an open
+                transaction before committing. The default of 1 commits every
+                insert immediately.
+            commit_interval: Maximum amount of time (as a timedelta) that a
+                row may stay uncommitted, or None to commit on row count only.
+            commit_clock: Clock interface used to time commit_interval.
+                Defaults to a UTC clock.
         """
+        if commit_batch_size < 1:
+            raise ValueError(
+                'commit_batch_size must be positive: %d' % commit_batch_size)
         self._connection = connection
         self._cursor = connection.cursor()
+        self._commit_batch_size = commit_batch_size
+        self._commit_timer = None
+        if commit_interval is not None:
+            self._commit_timer = clock.Timer(commit_clock or clock.Clock(),
+                                             commit_interval)
+        self._pending_rows = 0
+        self._commit_listeners = []
+
+    def add_commit_listener(self, listener):
+        """Registers a function to call after this store commits rows.
+        Args:
+            listener: A function that takes the number of rows committed.
+        """
+        self._commit_listeners.append(listener)
 
     def _do_insert(self, firebase, timestamp, value):
-        """Executes and commits a firebase insert command.
+        """Executes a firebase insert command and commits if a commit is due.
         Args:
           firebase: firebase query string for the insert command.
           timestamp: datetime instance representing the record timestamp.
           value: Value to insert for the record.
         """
-        timestamp_utc = _timestamp_to_utc(timestamp)
-        self._cursor.execute(firebase, (timestamp_utc.strftime(_TIMESTAMP_FORMAT),
-                                   value))
-        self._connection.commit()
+        self._do_insert_many(firebase, [(timestamp, value)])
 
-    def _do_get(self, firebase, record_type):
-        """Executes a firebase select query and returns the results.
+    def _do_insert_many(self, firebase, rows):
+        """Executes a firebase insert command for several rows at once.
         Args:
-          firebase: firebase select query string.
+          firebase: firebase query string for the insert command.
+          rows: A list of (timestamp, value) tuples, where timestamp is a
+            datetime instance representing the record timestamp.
+        """
+        if not rows:
+            return
+        epoch_rows = [(_timestamp_to_epoch(timestamp), value)
+                      for timestamp, value in rows]
+        self._cursor.executemany(firebase, epoch_rows)
+        self._after_insert(epoch_rows)
+        if self._pending_rows == 0 and self._commit_timer:
+            self._commit_timer.reset()
+        self._pending_rows += len(rows)
+        self.commit_if_due()
+
+    def _after_insert(self, epoch_rows):
+        """Updates derived tables in the same transaction as an insert.
+        Args:
+          epoch_rows: The inserted (timestamp, value) tuples, where timestamp
+            is in seconds since the Unix epoch.
+        """
+        pass
+
+    def commit_if_due(self):
+        """Commits pending rows if the batch is full or the interval elapsed.
+        Returns:
+            True if a commit was made.
+        """
+        if not self._pending_rows:
+            return False
+        if (self._pending_rows >= self._commit_batch_size or
+                (self._commit_timer and self._commit_timer.expired())):
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        """Commits any pending rows regardless of the commit policy."""
+        if not self._pending_rows:
+            return
+        self._connection.commit()
+        logger.debug('committed %d row(s)', self._pending_rows)
+        committed_rows = self._pending_rows
+        self._pending_rows = 0
+        for listener in self._commit_listeners:
+            listener(committed_rows)
+
+    def _do_iter(self, firebase, record_type, start=None, end=None,
+                 epoch_timestamps=False, chunk_size=_FETCH_CHUNK_SIZE):
+        """Executes a firebase select query and lazily yields the results.
+        Rows are fetched chunk_size at a time on a dedicated cursor, so memory
+        use does not grow with the size of the result and the store can keep
+        inserting while the caller iterates.
+        Args:
+          firebase: firebase select query string, selecting the timestamp and
+            value columns without any WHERE clause.
           record_type: The record type to parse the firebase results into.
+          start: If not None, only records at or after this datetime are
+            returned.
+          end: If not None, only records before this datetime are returned.
+          epoch_timestamps: If True, record timestamps are float seconds since
+            the Unix epoch instead of UTC datetimes.
+          chunk_size: Number of rows to fetch from the database at a time.
+        Yields:
+          Database records corresponding to the select query, in timestamp
+          order.
+        """
+        firebase, parameters = _range_query(firebase, start, end)
+        decode_timestamp = float if epoch_timestamps else _epoch_to_timestamp
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(firebase, parameters)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                for timestamp, value in rows:
+                    yield record_type(decode_timestamp(timestamp), value)
+        finally:
+            cursor.close()
+
+    def _do_to_numpy(self, firebase, record_type, start=None, end=None,
+                     chunk_size=_NUMPY_CHUNK_SIZE):
+        """Executes a firebase select query and returns a numpy array.
+        Rows are converted straight from the cursor, chunk_size at a time,
+        without building datetimes or records for them.
+        Args:
+          firebase: firebase select query string, selecting the timestamp and
+            value columns without any WHERE clause.
+          record_type: The record type whose field names name the array
+            fields.
+          start: If not None, only records at or after this datetime are
+            returned.
+          end: If not None, only records before this datetime are returned.
+          chunk_size: Number of rows to fetch from the database at a time.
         Returns:
-          A list of database records corresponding to the select query.
+          A numpy structured array with an int64 field of epoch seconds and a
+          float64 value field, in timestamp order.
+        Raises:
+          ImportError if numpy is not installed.
         """
-        self._cursor.execute(firebase)
-        data = []
-        for row in self._cursor.fetchall():
-            timestamp = datetime.datetime.strptime(row[0],
-                                                   _TIMESTAMP_FORMAT).replace(
-                                                       tzinfo=pytz.utc)
-            data.append((timestamp, row[1]))
-        typed_data = map(record_type._make, data)
-        return typed_data
-
+        if numpy is None:
+            raise ImportError('numpy is required to export records as arrays')
+        timestamp_field, value_field = record_type._fields
+        dtype = numpy.dtype([(timestamp_field, numpy.int64),
+                             (value_field, numpy.float64)])
+        firebase, parameters = _range_query(firebase, start, end)
+        chunks = []
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(firebase, parameters)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                chunks.append(numpy.array(rows, dtype=dtype))
+        finally:
+            cursor.close()
+        if not chunks:
+            return numpy.empty(0, dtype=dtype)
+        return numpy.concatenate(chunks)
+
+
+class _SensorStoreBase(_DbStoreBase):
+    """Base class for sensor stores, which keep hourly and daily rollups.
+    Subclasses set _TABLE to the name of their sensor table.
+    """
 
-class SoilMoistureStore(_DbStoreBase):
+    _TABLE = None
+
+    def __init__(self, *args, **kwargs):
+        super(_SensorStoreBase, self).__init__(*args, **kwargs)
+        self._rollup_commands = [
+            (bucket_seconds,
+             _CREATE_ROLLUP_BUCKET_COMMAND % _rollup_table(self._TABLE,
+                                                          resolution),
+             _UPDATE_ROLLUP_COMMAND % _rollup_table(self._TABLE, resolution))
+            for resolution, bucket_seconds in _ROLLUP_BUCKET_SECONDS.items()
+        ]
+
+    def _after_insert(self, epoch_rows):
+        for bucket_seconds, create_firebase, update_firebase in (
+                self._rollup_commands):
+            buckets = [(timestamp - timestamp % bucket_seconds, value)
+                       for timestamp, value in epoch_rows]
+            self._cursor.executemany(
+                create_firebase,
+                [(bucket, value, value) for bucket, value in buckets])
+            self._cursor.executemany(
+                update_firebase,
+                [(value, value, value, bucket) for bucket, value in buckets])
+
+    def get_rollup(self, resolution, start=None, end=None):
+        """Retrieves summaries of the readings per hour or per day.
+        Args:
+            resolution: HOURLY or DAILY.
+            start: If not None, only buckets starting at or after this
+                datetime are returned.
+            end: If not None, only buckets starting before this datetime are
+                returned.
+        Returns:
+            A list of RollupRecord objects, in timestamp order.
+        Raises:
+            ValueError if resolution is not a supported rollup resolution.
+        """
+        if resolution not in _ROLLUP_BUCKET_SECONDS:
+            raise ValueError('Unsupported rollup resolution: %s' % resolution)
+        firebase, parameters = _range_query(
+            'SELECT timestamp, count, minimum, maximum, total / count FROM %s' %
+            _rollup_table(self._TABLE, resolution), start, end)
+        self._cursor.execute(firebase, parameters)
+        return [
+            RollupRecord(_epoch_to_timestamp(row[0]), *row[1:])
+            for row in self._cursor.fetchall()
+        ]
+
+
+class SoilMoistureStore(_SensorStoreBase):
     """Stores and retrieves timestamp and soil moisture readings."""
 
+    _TABLE = 'soil_moisture'
+
     def insert(self, soil_moisture_record):
         """Inserts moisture and timestamp info into an firebase database.
         Args:
@@ -156,17 +588,67 @@ class SoilMoistureStore(_DbStoreBase):
                         soil_moisture_record.timestamp,
                         soil_moisture_record.soil_moisture)
 
-    def get(self):
+    def insert_many(self, soil_moisture_records):
+        """Inserts several soil moisture records with a single statement.
+        Args:
+            soil_moisture_records: List of soil moisture records to store.
+        """
+        self._do_insert_many('INSERT INTO soil_moisture VALUES (?, ?)',
+                             [(r.timestamp, r.soil_moisture)
+                              for r in soil_moisture_records])
+
+    def get(self, start=None, end=None, epoch_timestamps=False):
         """Retrieves timestamp and soil moisture readings.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
+            epoch_timestamps: If True, timestamps are float seconds since the
+                Unix epoch instead of UTC datetimes.
+        Returns:
+            A list of objects with 'timestamp' and 'soil_moisture' fields, in
+            timestamp order.
+        """
+        return list(self.iter_records(start, end, epoch_timestamps))
+
+    def iter_records(self, start=None, end=None, epoch_timestamps=False):
+        """Lazily yields timestamp and soil moisture readings.
+        Streams rows from the database in chunks, so iterating over the full
+        history runs in constant memory.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
+            epoch_timestamps: If True, timestamps are float seconds since the
+                Unix epoch instead of UTC datetimes.
+        Yields:
+            Objects with 'timestamp' and 'soil_moisture' fields, in timestamp
+            order.
+        """
+        return self._do_iter(
+            'SELECT timestamp, soil_moisture FROM soil_moisture',
+            SoilMoistureRecord, start, end, epoch_timestamps)
+
+    def to_numpy(self, start=None, end=None):
+        """Retrieves readings as a numpy structured array.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
         Returns:
-            A list of objects with 'timestamp' and 'soil_moisture' fields.
+            An array with int64 'timestamp' (seconds since the Unix epoch) and
+            float64 'soil_moisture' fields, in timestamp order.
         """
-        return self._do_get('SELECT * FROM soil_moisture', SoilMoistureRecord)
+        return self._do_to_numpy(
+            'SELECT timestamp, soil_moisture FROM soil_moisture',
+            SoilMoistureRecord, start, end)
 
 
-zzzzzclass LightStore(_DbStoreBase):
+class LightStore(_SensorStoreBase):
     """Stores timestamp and light readings."""
 
+    _TABLE = 'light'
+
     def insert(self, light_record):
         """Inserts light and timestamp info into an firebase database.
         Args:
@@ -175,17 +657,65 @@ zzzzzclass LightStore(_DbStoreBase):
         self._do_insert('INSERT INTO light VALUES (?, ?)',
                         light_record.timestamp, light_record.light)
 
-    def get(self):
+    def insert_many(self, light_records):
+        """Inserts several light records with a single statement.
+        Args:
+            light_records: List of light records to store.
+        """
+        self._do_insert_many('INSERT INTO light VALUES (?, ?)',
+                             [(r.timestamp, r.light) for r in light_records])
+
+    def get(self, start=None, end=None, epoch_timestamps=False):
         """Retrieves timestamp and light readings.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
+            epoch_timestamps: If True, timestamps are float seconds since the
+                Unix epoch instead of UTC datetimes.
+        Returns:
+            A list of objects with 'timestamp' and 'light' fields, in
+            timestamp order.
+        """
+        return list(self.iter_records(start, end, epoch_timestamps))
+
+    def iter_records(self, start=None, end=None, epoch_timestamps=False):
+        """Lazily yields timestamp and light readings.
+        Streams rows from the database in chunks, so iterating over the full
+        history runs in constant memory.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
+            epoch_timestamps: If True, timestamps are float seconds since the
+                Unix epoch instead of UTC datetimes.
+        Yields:
+            Objects with 'timestamp' and 'light' fields, in timestamp order.
+        """
+        return self._do_iter(
+            'SELECT timestamp, light FROM light',
+            LightRecord, start, end, epoch_timestamps)
+
+    def to_numpy(self, start=None, end=None):
+        """Retrieves readings as a numpy structured array.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
         Returns:
-            A list of objects with 'timestamp' and 'light' fields.
+            An array with int64 'timestamp' (seconds since the Unix epoch) and
+            float64 'light' fields, in timestamp order.
         """
-        return self._do_get('SELECT * FROM light', LightRecord)
+        return self._do_to_numpy(
+            'SELECT timestamp, light FROM light',
+            LightRecord, start, end)
 
 
-class HumidityStore(_DbStoreBase):
+class HumidityStore(_SensorStoreBase):
     """Stores timestamp and humidity readings."""
 
+    _TABLE = 'humidity'
+
     def insert(self, humidity_record):
         """Inserts humidity and timestamp info into an firebase database.
         Args:
@@ -194,17 +724,66 @@ class HumidityStore(_DbStoreBase):
         self._do_insert('INSERT INTO humidity VALUES (?, ?)',
                         humidity_record.timestamp, humidity_record.humidity)
 
-    def get(self):
+    def insert_many(self, humidity_records):
+        """Inserts several humidity records with a single statement.
+        Args:
+            humidity_records: List of humidity records to store.
+        """
+        self._do_insert_many('INSERT INTO humidity VALUES (?, ?)',
+                             [(r.timestamp, r.humidity)
+                              for r in humidity_records])
+
+    def get(self, start=None, end=None, epoch_timestamps=False):
         """Retrieves timestamp and relative humidity readings.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
+            epoch_timestamps: If True, timestamps are float seconds since the
+                Unix epoch instead of UTC datetimes.
+        Returns:
+            A list of objects with 'timestamp' and 'humidity' fields, in
+            timestamp order.
+        """
+        return list(self.iter_records(start, end, epoch_timestamps))
+
+    def iter_records(self, start=None, end=None, epoch_timestamps=False):
+        """Lazily yields timestamp and relative humidity readings.
+        Streams rows from the database in chunks, so iterating over the full
+        history runs in constant memory.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
+            epoch_timestamps: If True, timestamps are float seconds since the
+                Unix epoch instead of UTC datetimes.
+        Yields:
+            Objects with 'timestamp' and 'humidity' fields, in timestamp order.
+        """
+        return self._do_iter(
+            'SELECT timestamp, humidity FROM humidity',
+            HumidityRecord, start, end, epoch_timestamps)
+
+    def to_numpy(self, start=None, end=None):
+        """Retrieves readings as a numpy structured array.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
         Returns:
-            A list of objects with 'timestamp' and 'humidity' fields.
+            An array with int64 'timestamp' (seconds since the Unix epoch) and
+            float64 'humidity' fields, in timestamp order.
         """
-        return self._do_get('SELECT * FROM humidity', HumidityRecord)
+        return self._do_to_numpy(
+            'SELECT timestamp, humidity FROM humidity',
+            HumidityRecord, start, end)
 
 
-class TemperatureStore(_DbStoreBase):
+class TemperatureStore(_SensorStoreBase):
     """Stores timestamp and temperature readings."""
 
+    _TABLE = 'temperature'
+
     def insert(self, temperature_record):
         """Inserts temperature and timestamp info into an firebase database.
         Args:
@@ -214,12 +793,60 @@ class TemperatureStore(_DbStoreBase):
                         temperature_record.timestamp,
                         temperature_record.temperature)
 
-    def get(self):
+    def insert_many(self, temperature_records):
+        """Inserts several temperature records with a single statement.
+        Args:
+            temperature_records: List of temperature records to store.
+        """
+        self._do_insert_many('INSERT INTO temperature VALUES (?, ?)',
+                             [(r.timestamp, r.temperature)
+                              for r in temperature_records])
+
+    def get(self, start=None, end=None, epoch_timestamps=False):
         """Retrieves timestamp and temperature(C) readings.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
+            epoch_timestamps: If True, timestamps are float seconds since the
+                Unix epoch instead of UTC datetimes.
+        Returns:
+            A list of objects with 'timestamp' and 'temperature' fields, in
+            timestamp order.
+        """
+        return list(self.iter_records(start, end, epoch_timestamps))
+
+    def iter_records(self, start=None, end=None, epoch_timestamps=False):
+        """Lazily yields timestamp and temperature(C) readings.
+        Streams rows from the database in chunks, so iterating over the full
+        history runs in constant memory.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
+            epoch_timestamps: If True, timestamps are float seconds since the
+                Unix epoch instead of UTC datetimes.
+        Yields:
+            Objects with 'timestamp' and 'temperature' fields, in timestamp
+            order.
+        """
+        return self._do_iter(
+            'SELECT timestamp, temperature FROM temperature',
+            TemperatureRecord, start, end, epoch_timestamps)
+
+    def to_numpy(self, start=None, end=None):
+        """Retrieves readings as a numpy structured array.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
         Returns:
-            A list of objects with 'timestamp' and 'temperature' fields.
+            An array with int64 'timestamp' (seconds since the Unix epoch) and
+            float64 'temperature' fields, in timestamp order.
         """
-        return self._do_get('SELECT * FROM temperature', TemperatureRecord)
+        return self._do_to_numpy(
+            'SELECT timestamp, temperature FROM temperature',
+            TemperatureRecord, start, end)
 
 
 class WateringEventStore(_DbStoreBase):
@@ -234,10 +861,148 @@ class WateringEventStore(_DbStoreBase):
                         watering_event_record.timestamp,
                         watering_event_record.water_released)
 
-    def get(self):
+    def insert_many(self, watering_event_records):
+        """Inserts several watering event records with a single statement.
+        Args:
+            watering_event_records: List of watering event records to store.
+        """
+        self._do_insert_many('INSERT INTO watering_events VALUES (?, ?)',
+                             [(r.timestamp, r.water_released)
+                              for r in watering_event_records])
+
+    def get(self, start=None, end=None, epoch_timestamps=False):
         """Retrieves timestamp and volume of water released(in ms).
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
+            epoch_timestamps: If True, timestamps are float seconds since the
+                Unix epoch instead of UTC datetimes.
+        Returns:
+            A list of objects with 'timestamp' and 'water_released' fields, in
+            timestamp order.
+        """
+        return list(self.iter_records(start, end, epoch_timestamps))
+
+    def iter_records(self, start=None, end=None, epoch_timestamps=False):
+        """Lazily yields timestamp and volume of water released(in ms).
+        Streams rows from the database in chunks, so iterating over the full
+        history runs in constant memory.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
+            epoch_timestamps: If True, timestamps are float seconds since the
+                Unix epoch instead of UTC datetimes.
+        Yields:
+            Objects with 'timestamp' and 'water_released' fields, in timestamp
+            order.
+        """
+        return self._do_iter(
+            'SELECT timestamp, water_released FROM watering_events',
+            WateringEventRecord, start, end, epoch_timestamps)
+
+    def latest(self):
+        """Retrieves the most recent watering event.
+        Walks the timestamp index from its newest end, so the cost does not
+        depend on how many watering events the database holds.
         Returns:
-            A list of objects with 'timestamp' and 'water_released' fields.
+            An object with 'timestamp' and 'water_released' fields, or None if
+            no watering event has been stored.
         """
-        return self._do_get('SELECT * FROM watering_events',
-                            WateringEventRecord)
\ No newline at end of file
+        self._cursor.execute('SELECT timestamp, water_released '
+                             'FROM watering_events '
+                             'ORDER BY timestamp DESC LIMIT 1')
+        row = self._cursor.fetchone()
+        if row is None:
+            return None
+        return WateringEventRecord(_epoch_to_timestamp(row[0]), row[1])
+
+    def to_numpy(self, start=None, end=None):
+        """Retrieves readings as a numpy structured array.
+        Args:
+            start: If not None, only readings at or after this datetime are
+                returned.
+            end: If not None, only readings before this datetime are returned.
+        Returns:
+            An array with int64 'timestamp' (seconds since the Unix epoch) and
+            float64 'water_released' fields, in timestamp order.
+        """
+        return self._do_to_numpy(
+            'SELECT timestamp, water_released FROM watering_events',
+            WateringEventRecord, start, end)
+
+
+class SyncStateStore(object):
+    """Reads rows that have not been synced yet and tracks sync progress.
+    Each data table has a high-water mark: the largest rowid already uploaded.
+    Rows are only ever appended with rowids above the current maximum, so
+    every row above the mark is new. Retention only deletes the oldest rows,
+    which leaves the maximum rowid in place unless it empties a table; the
+    mark is reset when that happens so that reused rowids are not skipped.
+    """
+
+    def __init__(self, connection):
+        """Creates a new SyncStateStore.
+        Args:
+            connection: firebase database connection. Only committed rows are
+                visible to it, so it should not be the connection the record
+                stores write through.
+        """
+        self._connection = connection
+        self._cursor = connection.cursor()
+
+    def tables(self):
+        """Returns the names of the data tables to sync."""
+        return list(_TABLE_VALUE_COLUMNS)
+
+    def value_column(self, table):
+        """Returns the name of a data table's value column."""
+        return _TABLE_VALUE_COLUMNS[table]
+
+    def high_water_mark(self, table):
+        """Returns the largest rowid of the table that has been synced.
+        Args:
+            table: Name of a data table.
+        Returns:
+            A rowid, or 0 if no row of the table has been synced.
+        """
+        self._cursor.execute(
+            'SELECT last_rowid FROM sync_state WHERE source_table = ?',
+            (table,))
+        row = self._cursor.fetchone()
+        last_rowid = row[0] if row else 0
+        if last_rowid:
+            self._cursor.execute('SELECT MAX(rowid) FROM %s' % table)
+            max_rowid = self._cursor.fetchone()[0] or 0
+            if max_rowid < last_rowid:
+                logger.info('%s was emptied since it was last synced; '
+                            'resetting its high-water mark', table)
+                last_rowid = 0
+        return last_rowid
+
+    def rows_after(self, table, rowid, limit):
+        """Retrieves the rows of a table that come after a rowid.
+        Args:
+            table: Name of a data table.
+            rowid: Only rows with a larger rowid are returned.
+            limit: Maximum number of rows to return.
+        Returns:
+            A list of (rowid, timestamp, value) tuples in rowid order, where
+            timestamp is in seconds since the Unix epoch.
+        """
+        self._cursor.execute(
+            'SELECT rowid, timestamp, %s FROM %s WHERE rowid > ? '
+            'ORDER BY rowid LIMIT ?' % (_TABLE_VALUE_COLUMNS[table], table),
+            (rowid, limit))
+        return self._cursor.fetchall()
+
+    def set_high_water_mark(self, table, rowid):
+        """Durably records that a table has been synced up to a rowid.
+        Args:
+            table: Name of a data table.
+            rowid: Largest rowid of the table that has been synced.
+        """
+        self._cursor.execute(
+            'INSERT OR REPLACE INTO sync_state VALUES (?, ?)', (table, rowid))
+        self._connection.commit()
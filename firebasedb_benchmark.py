@@ -0,0 +1,78 @@
+"""Measures how fast the stores decode history reads.
+
+Loads the same readings into a schema version 0 table (text timestamps) and
+a current table (epoch timestamps) in an in-memory SQLite database, then
+times a full read through each path. Usage:
+
+    python firebasedb_benchmark.py [--rows N]
+"""
+
+import argparse
+import datetime
+import sqlite3
+import time
+
+import pytz
+
+import firebasedb
+
+# Timestamp format used by schema version 0.
+_V0_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%MZ'
+_START_EPOCH = 1577836800  # 2020-01-01T00:00Z
+
+
+def _load_rows(connection, row_count):
+    cursor = connection.cursor()
+    firebasedb._create_tables(cursor)
+    cursor.execute('CREATE TABLE soil_moisture_v0 '
+                   '(timestamp TEXT, soil_moisture INTEGER)')
+    epochs = range(_START_EPOCH, _START_EPOCH + 60 * row_count, 60)
+    cursor.executemany('INSERT INTO soil_moisture VALUES (?, ?)',
+                       ((epoch, epoch % 1024) for epoch in epochs))
+    cursor.executemany(
+        'INSERT INTO soil_moisture_v0 VALUES (?, ?)',
+        ((datetime.datetime.utcfromtimestamp(epoch).strftime(
+            _V0_TIMESTAMP_FORMAT), epoch % 1024) for epoch in epochs))
+    connection.commit()
+
+
+def _read_v0(connection):
+    """Reads every row the way schema version 0 stores did."""
+    cursor = connection.cursor()
+    cursor.execute('SELECT * FROM soil_moisture_v0')
+    data = []
+    for row in cursor.fetchall():
+        timestamp = datetime.datetime.strptime(
+            row[0], _V0_TIMESTAMP_FORMAT).replace(tzinfo=pytz.utc)
+        data.append((timestamp, row[1]))
+    return list(map(firebasedb.SoilMoistureRecord._make, data))
+
+
+def _time(label, read_function, row_count):
+    start = time.time()
+    records = read_function()
+    elapsed = time.time() - start
+    assert len(records) == row_count
+    print('%-28s %7.3f s  %6.0f ns/row' % (label, elapsed,
+                                           elapsed / row_count * 1e9))
+
+
+def main(args):
+    connection = sqlite3.connect(':memory:')
+    _load_rows(connection, args.rows)
+    store = firebasedb.SoilMoistureStore(connection)
+
+    print('rows: %d' % args.rows)
+    _time('v0 text + strptime', lambda: _read_v0(connection), args.rows)
+    _time('epoch -> datetime', store.get, args.rows)
+    _time('epoch -> float', lambda: store.get(epoch_timestamps=True),
+          args.rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='firebasedb_benchmark',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        '--rows', type=int, help='Number of readings to load', default=1000000)
+    main(parser.parse_args())
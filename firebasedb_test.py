@@ -0,0 +1,110 @@
+import datetime
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import pytz
+
+import firebasedb
+import storage_backend
+
+
+def _create_v0_db(db_path):
+    connection = sqlite3.connect(db_path)
+    for table, value_column in firebasedb._TABLE_VALUE_COLUMNS.items():
+        connection.execute('CREATE TABLE %s (timestamp TEXT, %s REAL)' %
+                           (table, value_column))
+        connection.execute("INSERT INTO %s VALUES ('2020-01-01T00:00Z', 1)" %
+                           table)
+    connection.commit()
+    connection.close()
+
+
+def _tables(connection):
+    return sorted(row[0] for row in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"))
+
+
+class MigrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, 'gardenpi.db')
+        _create_v0_db(self.db_path)
+        self.backend = storage_backend.SqliteBackend()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_failed_migration_leaves_database_unchanged(self):
+        connection = sqlite3.connect(self.db_path)
+        tables_before = _tables(connection)
+        connection.close()
+
+        backfill = firebasedb._backfill_rollup_tables
+
+        def failing_backfill(cursor):
+            raise sqlite3.OperationalError('injected failure')
+
+        firebasedb._backfill_rollup_tables = failing_backfill
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                firebasedb.open_or_create_db(self.db_path, self.backend)
+        finally:
+            firebasedb._backfill_rollup_tables = backfill
+
+        connection = sqlite3.connect(self.db_path)
+        self.assertEqual(tables_before, _tables(connection))
+        self.assertEqual(
+            0, connection.execute('PRAGMA user_version').fetchone()[0])
+        connection.close()
+
+        # The next start migrates the untouched database.
+        connection = firebasedb.open_or_create_db(self.db_path, self.backend)
+        self.assertEqual(
+            firebasedb._SCHEMA_VERSION,
+            connection.execute('PRAGMA user_version').fetchone()[0])
+        self.assertEqual(
+            [(1577836800, 1)],
+            connection.execute('SELECT * FROM soil_moisture').fetchall())
+        connection.close()
+
+
+class RollupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = firebasedb.open_or_create_db(
+            'gardenpi.db', storage_backend.MemoryBackend())
+        self.store = firebasedb.TemperatureStore(self.connection)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_rollups_count_every_reading(self):
+        hour = datetime.datetime(2020, 1, 1, 6, tzinfo=pytz.utc)
+        minutes = lambda count: datetime.timedelta(minutes=count)
+        self.store.insert(firebasedb.TemperatureRecord(hour, 20.0))
+        # Several readings in one batch share a bucket that already exists,
+        # and several more share one that does not.
+        self.store.insert_many([
+            firebasedb.TemperatureRecord(hour + minutes(10), 24.0),
+            firebasedb.TemperatureRecord(hour + minutes(20), 16.0),
+            firebasedb.TemperatureRecord(hour + minutes(60), 10.0),
+            firebasedb.TemperatureRecord(hour + minutes(70), 14.0),
+            firebasedb.TemperatureRecord(hour + minutes(80), 12.0),
+        ])
+
+        self.assertEqual([
+            firebasedb.RollupRecord(hour, 3, 16.0, 24.0, 20.0),
+            firebasedb.RollupRecord(hour + minutes(60), 3, 10.0, 14.0, 12.0),
+        ], self.store.get_rollup(firebasedb.HOURLY))
+        self.assertEqual([
+            firebasedb.RollupRecord(hour - datetime.timedelta(hours=6), 6,
+                                    10.0, 24.0, 16.0),
+        ], self.store.get_rollup(firebasedb.DAILY))
+
+
+if __name__ == '__main__':
+    unittest.main()
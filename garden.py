@@ -1,24 +1,36 @@
-import argparce
+import adc_thread_safe
+import argparse
 import clock
+import cloud_sync
+import contextlib
 import datetime
+import functools
 import logging
+import signal
+import threading
 import time
 
-# from ssl import CHANNEL_BINDING_TYPES
-from typing_extensions import self
-
-import RPi.GPIO as GPIO
-import os
-from time import sleep
-from firebase import firebase
-from gpio import Gpio
+import camera_manager
+import databus
+import firebase_rest
+import firebasedb as db_store
+import hardware_sim
+import health
+import input_relay
+import pi_io
+import record_processor
 import solenoid
 import solenoid_history
 import sleep_windows
-import soil_moisture_sensor
-
-firebase = firebase.FirebaseApplication(
-    'https://console.firebase.google.com/project/garden-data-827b1/database/garden-data-827b1-default-rtdb/data/~2F')
+import record_journal
+import retention
+import sensor_cache
+import sensors
+import spill_queue
+import storage_backend
+import upload_queue
+import upload_worker
+import wiring_config_parser
 
 logger = logging.getLogger(__name__)
 
@@ -38,39 +50,182 @@ def configure_logging(verbose):
         root_logger.setLevel(logging.WARNING)
 
 
-# Pin setup and Def
-chan_list = [2, 3, 4, 14, 15, 17, 18, 27, 22, 23, 24]
-GPIO.setup(2, GPIO.OUT)
-GPIO.setup(3, GPIO.OUT)
-GPIO.setup(4, GPIO.OUT)
-GPIO.setup(14, GPIO.OUT)
-GPIO.setup(15, GPIO.OUT)
-GPIO.setup(17, GPIO.OUT)
-GPIO.setup(18, GPIO.OUT)
-GPIO.setup(27, GPIO.IN)
-GPIO.setup(22, GPIO.IN)
-GPIO.setup(23, GPIO.IN)
-GPIO.setup(24, GPIO.IN)
-
-# Initial state of output pins
-GPIO.output(2, GPIO.LOW)
-GPIO.output(3, GPIO.LOW)
-GPIO.output(4, GPIO.LOW)
-GPIO.output(14, GPIO.LOW)
-GPIO.output(15, GPIO.LOW)
-GPIO.output(17, GPIO.LOW)
-GPIO.output(18, GPIO.LOW)
-
-
-def measure_temperature():
-    temperature = os.popen("vcgencmd measure_temp").readline()  # Retrieves temperature of the raspberry pi motherboard 
-    return (temperature.replace("temp=", ""))
-
-
-def make_soil_moisture_sensor(adc, raspberry_pi_io, wiring_config):
-    return soil_moisture_sensor.SoilMoistureSensor(
+# How long a sensor reading is shared between consumers, such as the databus
+# and the camera, before the hardware is read again. Keyed by the sensor's
+# reading method. A DHT11 cannot be read more often than every second or two.
+SENSOR_CACHE_TTLS = {
+    'soil_moisture': datetime.timedelta(seconds=30),
+    'temperature': datetime.timedelta(seconds=10),
+    'humidity': datetime.timedelta(seconds=10),
+    'light': datetime.timedelta(seconds=10),
+}
+
+
+# A DHT11 takes about a second to read and cannot be read more often than
+# every second or two. Temperature and humidity come from the same read, so
+# the two sensor wrappers share one reading for this long.
+DHT11_READ_INTERVAL = datetime.timedelta(seconds=2)
+
+
+def read_wiring_config(config_filename):
+    logger.info('reading wiring config at "%s"', config_filename)
+    with open(config_filename) as config_file:
+        return wiring_config_parser.parse(config_file)
+
+
+def init_hardware(gpio, wiring_config):
+    """Sets up every GPIO pin the wiring config uses.
+    Output pins are set up low, then input pins, with one GPIO call each.
+    The DHT11 and MCP3008 pins are left to their drivers.
+    Args:
+        gpio: Raspberry Pi GPIO module.
+        wiring_config: Wiring configuration for the gardenpi.
+    Returns:
+        A pi_io.IO instance for the set-up pins.
+    """
+    raspberry_pi_io = pi_io.IO(gpio)
+    gpio_pins = wiring_config.gpio_pins
+    output_pins = ([gpio_pins.soil_moisture, gpio_pins.solenoid] +
+                   sorted(wiring_config.relay_pins.values()) +
+                   list(wiring_config.extra_output_pins))
+    input_pins = sorted(wiring_config.relay_pins)
+    raspberry_pi_io.setup_pins(output_pins, input_pins)
+    logger.info('set up output pins %s and input pins %s', output_pins,
+                input_pins)
+    return raspberry_pi_io
+
+
+def make_simulated_devices(adc_latency, dht11_latency, camera_latency,
+                           wiring_config, soil_moisture_script, light_script,
+                           temperature_script, humidity_script, seed):
+    """Creates simulated stand-ins for the gardenpi's sensor hardware.
+    Args:
+        adc_latency: Number of seconds each simulated ADC read takes.
+        dht11_latency: Number of seconds each simulated DHT11 read takes.
+        camera_latency: Number of seconds each simulated photo takes.
+        wiring_config: Wiring configuration for the gardenpi.
+        soil_moisture_script: Comma-separated raw ADC values for the soil
+            moisture sensor to repeat, or None for a random walk.
+        light_script: Comma-separated raw ADC values for the light sensor to
+            repeat, or None for a random walk.
+        temperature_script: Comma-separated temperatures (in degrees Celsius)
+            to repeat, or None for a random walk.
+        humidity_script: Comma-separated relative humidities (in percent) to
+            repeat, or None for a random walk.
+        seed: Seed for the random walks, or None.
+    Returns:
+        A (raw ADC, DHT driver, camera) tuple.
+    """
+    logger.info('simulating sensor hardware')
+    adc_channels = wiring_config.adc_channels
+    adc = hardware_sim.SimulatedAdc({
+        adc_channels.soil_moisture_sensor: hardware_sim.parse_signal(
+            soil_moisture_script,
+            hardware_sim.RandomWalkSignal(600, 10, 0, 1023, seed)),
+        adc_channels.light_sensor: hardware_sim.parse_signal(
+            light_script,
+            hardware_sim.RandomWalkSignal(700, 20, 0, 1023, seed)),
+    }, adc_latency)
+    dht_driver = hardware_sim.SimulatedDhtDriver(
+        hardware_sim.parse_signal(
+            humidity_script,
+            hardware_sim.RandomWalkSignal(50, 0.5, 20, 90, seed)),
+        hardware_sim.parse_signal(
+            temperature_script,
+            hardware_sim.RandomWalkSignal(22, 0.2, 10, 35, seed)),
+        dht11_latency)
+    return adc, dht_driver, hardware_sim.SimulatedCamera(camera_latency)
+
+
+def make_adc(wiring_config, raw_adc=None):
+    """Creates a thread-safe interface to the MCP3008 ADC.
+    Args:
+        wiring_config: Wiring configuration for the gardenpi.
+        raw_adc: ADC to use instead of the MCP3008, such as a simulated one.
+    """
+    if raw_adc is None:
+        import Adafruit_MCP3008
+        gpio_pins = wiring_config.gpio_pins
+        raw_adc = Adafruit_MCP3008.MCP3008(clk=gpio_pins.mcp3008_clk,
+                                           cs=gpio_pins.mcp3008_cs_shdn,
+                                           miso=gpio_pins.mcp3008_dout,
+                                           mosi=gpio_pins.mcp3008_din)
+    return adc_thread_safe.Adc(raw_adc)
+
+
+def make_dht11_sensors(wiring_config, dht_driver=None):
+    """Creates the temperature and humidity sensors of the DHT11.
+    Args:
+        wiring_config: Wiring configuration for the gardenpi.
+        dht_driver: DHT driver to use instead of the Adafruit_DHT module,
+            such as a simulated one.
+    Returns:
+        A (TemperatureSensor, HumiditySensor) tuple that share each DHT11
+        read.
+    """
+    if dht_driver is None:
+        import Adafruit_DHT as dht_driver
+    dht11 = sensor_cache.CachedSensor(
+        sensors.Dht11(dht_driver, wiring_config.gpio_pins.dht11), ['read'],
+        DHT11_READ_INTERVAL)
+    return sensors.TemperatureSensor(dht11), sensors.HumiditySensor(dht11)
+
+
+def make_camera_manager(rotation, image_path, light_sensor, camera=None):
+    """Creates a camera manager instance.
+    Args:
+        rotation: Amount (in degrees) to rotate the camera's photos.
+        image_path: Path to the folder in which to save photos.
+        light_sensor: Light sensor, used to skip photos in the dark.
+        camera: Camera to use instead of the Pi camera, such as a simulated
+            one.
+    """
+    if camera is None:
+        import picamera
+        camera = picamera.PiCamera()
+    camera.rotation = rotation
+    return camera_manager.CameraManager(image_path, clock.Clock(), camera,
+                                        light_sensor)
+
+
+def make_soil_moisture_sensor(adc, raspberry_pi_io, wiring_config, samples,
+                              sample_filter, settle_seconds):
+    return sensors.SoilMoistureSensor(
         adc, raspberry_pi_io, wiring_config.adc_channels.soil_moisture_sensor,
-        wiring_config.gpio_pins.soil_moisture)
+        wiring_config.gpio_pins.soil_moisture, samples, sample_filter,
+        settle_seconds=settle_seconds)
+
+
+def make_light_sensor(adc, wiring_config):
+    return sensors.LightSensor(adc, wiring_config.adc_channels.light_sensor)
+
+
+def make_cached_sensor(sensor, reading_method):
+    """Puts a read-through cache in front of a sensor.
+    Args:
+        sensor: Sensor wrapper to cache.
+        reading_method: Name of the sensor's reading method, which must be a
+            key of SENSOR_CACHE_TTLS.
+    Returns:
+        A CachedSensor that shares each reading between every consumer of
+        the sensor for the reading's TTL.
+    """
+    return sensor_cache.CachedSensor(sensor, [reading_method],
+                                     SENSOR_CACHE_TTLS[reading_method])
+
+
+def make_sensor_adc(adc, wiring_config):
+    """Wraps the ADC so that the sensors on it share burst reads.
+    Args:
+        adc: Thread-safe ADC interface.
+        wiring_config: Wiring configuration for the gardenpi.
+    Returns:
+        A BurstSampler that reads the soil moisture and light channels
+        together.
+    """
+    return adc_thread_safe.BurstSampler(
+        adc, [wiring_config.adc_channels.soil_moisture_sensor,
+              wiring_config.adc_channels.light_sensor])
 
 
 def make_solenoid_manager(moisture_threshold, sleep_windows, raspberry_pi_io,
@@ -148,39 +303,236 @@ def make_sensor_databus(databus_interval, photo_interval, record_queue,
     ]  # yapf: disable
 
 
-def create_record_processor(db_connection, record_queue):
+def make_retention_engine(db_connection, raw_retention_days,
+                          hourly_retention_days, before_commit=None):
+    """Creates a retention engine for the gardenpi sensor tables.
+    Args:
+        db_connection: Database connection to delete expired rows from.
+        raw_retention_days: Number of days to keep raw sensor readings, or None
+            to keep them forever.
+        hourly_retention_days: Number of days to keep hourly rollups, or None
+            to keep them forever. Daily rollups and watering events are always
+            kept.
+        before_commit: Function that flushes the stores sharing db_connection,
+            called before deleted rows are committed, or None.
+    Returns:
+        A RetentionEngine instance, or None if nothing ever expires.
+    """
+    policies = []
+    for table in ('temperature', 'humidity', 'soil_moisture', 'light'):
+        if raw_retention_days is not None:
+            policies.append(retention.RetentionPolicy(
+                table, datetime.timedelta(days=raw_retention_days)))
+        if hourly_retention_days is not None:
+            policies.append(retention.RetentionPolicy(
+                '%s_%s' % (table, db_store.HOURLY),
+                datetime.timedelta(days=hourly_retention_days)))
+    if not policies:
+        return None
+    return retention.RetentionEngine(db_connection, policies,
+                                     before_commit=before_commit)
+
+
+def make_firebase_client(database_url, auth_token, pool_size):
+    """Creates the client that every cloud upload shares.
+    Args:
+        database_url: Root URL of the Firebase Realtime Database, or an empty
+            string to disable cloud uploads.
+        auth_token: Token to authenticate to the database with, or None.
+        pool_size: Maximum number of keep-alive connections to the database.
+    Returns:
+        A FirebaseClient instance, or None if cloud uploads are disabled.
+    """
+    if not database_url:
+        logger.info('cloud uploads are disabled')
+        return None
+    return firebase_rest.FirebaseClient(database_url, auth_token,
+                                        pool_size=pool_size)
+
+
+def make_upload_worker(client, queue_file, queue_max_bytes):
+    """Creates a worker that sends ad-hoc cloud writes off the main thread.
+    Args:
+        client: FirebaseClient to send writes with, or None to disable cloud
+            writes.
+        queue_file: Path to the file in which to keep writes until they are
+            sent.
+        queue_max_bytes: Maximum size of the queue file, in bytes.
+    Returns:
+        An UploadWorker instance, or None if cloud writes are disabled.
+    """
+    if not client:
+        return None
+    return upload_worker.UploadWorker(
+        client, upload_queue.UploadQueue(queue_file, queue_max_bytes))
+
+
+def make_health_monitor(cloud_uploads, root_path, interval):
+    """Creates a monitor that uploads CPU temperature and usage samples.
+    Args:
+        cloud_uploads: UploadWorker to queue samples on, or None to disable
+            health monitoring.
+        root_path: Database path under which to post the samples.
+        interval: Amount of time between samples.
+    Returns:
+        A HealthMonitor instance, or None if health monitoring is disabled.
+    """
+    if not cloud_uploads:
+        return None
+    return health.HealthMonitor(health.HealthSampler(), cloud_uploads,
+                                root_path, interval)
+
+
+def make_cloud_sync(client, root_path, sync_interval, batch_size, db_file,
+                    db_synchronous, commit_interval):
+    """Creates a background thread that syncs the database to Firebase.
+    Args:
+        client: FirebaseClient to upload rows with, or None to disable
+            syncing.
+        root_path: Database path under which to store each table.
+        sync_interval: Amount of time between syncs.
+        batch_size: Maximum number of rows to upload per request.
+        db_file: Path to the gardenpi database file.
+        db_synchronous: SQLite synchronous setting for the database file.
+        commit_interval: Maximum amount of time the record processor holds a
+            transaction open.
+    Returns:
+        A SyncThread instance, or None if syncing is disabled.
+    """
+    if not client:
+        return None
+    # The sync thread records its progress in the database, so it may have to
+    # wait out the record processor's open group-commit transaction.
+    sync_backend = storage_backend.SqliteBackend(
+        db_synchronous,
+        busy_timeout=commit_interval.total_seconds() +
+        storage_backend.DEFAULT_BUSY_TIMEOUT_SECONDS)
+    return cloud_sync.SyncThread(lambda: sync_backend.connect(db_file),
+                                 client, root_path, sync_interval, batch_size)
+
+
+def create_record_processor(db_connection, record_queue, commit_batch_size,
+                            commit_interval, journal, raw_retention_days,
+                            hourly_retention_days):
     """Creates a record processor for storing records in a database.
     Args:
         db_connection: Database connection to use to store records.
         record_queue: Record queue from which to process records.
+        commit_batch_size: Maximum number of sensor readings to group into a
+            single database commit.
+        commit_interval: Maximum amount of time a sensor reading may wait for
+            its group commit.
+        journal: Record journal to acknowledge records in once committed.
+        raw_retention_days: Number of days to keep raw sensor readings, or None
+            to keep them forever.
+        hourly_retention_days: Number of days to keep hourly rollups, or None
+            to keep them forever.
     """
-    return record_processor.RecordProcessor(
-        record_queue,
-        db_store.SoilMoistureStore(db_connection),
-        db_store.LightStore(db_connection),
-        db_store.HumidityStore(db_connection),
-        db_store.TemperatureStore(db_connection),
-        db_store.WateringEventStore(db_connection))
+    make_sensor_store = lambda store_class: store_class(
+        db_connection, commit_batch_size, commit_interval)
+    record_stores = {
+        db_store.SoilMoistureRecord:
+            make_sensor_store(db_store.SoilMoistureStore),
+        db_store.LightRecord: make_sensor_store(db_store.LightStore),
+        db_store.HumidityRecord: make_sensor_store(db_store.HumidityStore),
+        db_store.TemperatureRecord:
+            make_sensor_store(db_store.TemperatureStore),
+        # Watering events are rare and the solenoid timer is restored from
+        # them at startup, so commit them immediately.
+        db_store.WateringEventRecord:
+            db_store.WateringEventStore(db_connection),
+    }
+    for record_type, store in record_stores.items():
+        store.add_commit_listener(
+            functools.partial(journal.acknowledge, record_type=record_type))
+
+    def flush_stores():
+        for store in record_stores.values():
+            store.flush()
+
+    # The retention engine shares the stores' connection, so it commits their
+    # open group-commit transactions through them rather than behind their
+    # backs, where the journal would never hear that the rows are durable.
+    retention_engine = make_retention_engine(
+        db_connection, raw_retention_days, hourly_retention_days,
+        flush_stores)
+    idle_task = retention_engine.run_step if retention_engine else None
+    return record_processor.RecordProcessor(record_queue, record_stores,
+                                            idle_task)
 
 
 def main(args):
     configure_logging(args.verbose)
     logger.info('starting gardenpi')
     wiring_config = read_wiring_config(args.config_file)
-    record_queue = Queue.Queue()
-    raspberry_pi_io = pi_io.IO(GPIO)
-    adc = make_adc(wiring_config)
-    local_soil_moisture_sensor = make_soil_moisture_sensor(
-        adc, raspberry_pi_io, wiring_config)
-    local_temperature_sensor, local_humidity_sensor = make_dht11_sensors(
+    record_queue = spill_queue.SpillingQueue(args.queue_capacity,
+                                             args.spill_file)
+    journal = record_journal.RecordJournal(args.journal_file)
+    # Every spilled record was journaled first, so the journal alone decides
+    # what the last run left uncommitted.
+    record_queue.clear()
+    # Requeue records that were journaled but never committed before the last
+    # shutdown or power loss. They are already in the journal, so they bypass
+    # the journaled queue.
+    for record in journal.replay():
+        record_queue.put(record)
+    journaled_record_queue = record_journal.JournaledQueue(journal,
+                                                          record_queue)
+    raspberry_pi_io = init_hardware(
+        hardware_sim.load_gpio(args.simulate,
+                               args.sim_gpio_latency_ms / 1000.0,
+                               args.sim_gpio_latency_ms / 1000.0),
         wiring_config)
-    local_light_sensor = make_light_sensor(adc, wiring_config)
+    relay = input_relay.InputRelay(raspberry_pi_io, wiring_config.relay_pins,
+                                   args.relay_bouncetime_ms)
+    if args.simulate:
+        raw_adc, dht_driver, camera = make_simulated_devices(
+            args.sim_adc_latency_ms / 1000.0,
+            args.sim_dht11_latency_ms / 1000.0,
+            args.sim_camera_latency_ms / 1000.0, wiring_config,
+            args.sim_soil_moisture, args.sim_light, args.sim_temperature,
+            args.sim_humidity, args.sim_seed)
+    else:
+        raw_adc = dht_driver = camera = None
+    adc = make_sensor_adc(make_adc(wiring_config, raw_adc), wiring_config)
+    local_soil_moisture_sensor = make_cached_sensor(
+        make_soil_moisture_sensor(
+            adc, raspberry_pi_io, wiring_config, args.soil_moisture_samples,
+            args.soil_moisture_filter, args.soil_moisture_settle_ms / 1000.0),
+        'soil_moisture')
+    local_temperature_sensor, local_humidity_sensor = make_dht11_sensors(
+        wiring_config, dht_driver)
+    local_temperature_sensor = make_cached_sensor(local_temperature_sensor,
+                                                  'temperature')
+    local_humidity_sensor = make_cached_sensor(local_humidity_sensor,
+                                               'humidity')
+    local_light_sensor = make_cached_sensor(
+        make_light_sensor(adc, wiring_config), 'light')
     camera_manager = make_camera_manager(args.camera_rotation, args.image_path,
-                                         local_light_sensor)
+                                         local_light_sensor, camera)
 
+    commit_interval = datetime.timedelta(milliseconds=args.commit_interval_ms)
+    firebase_client = make_firebase_client(
+        args.firebase_url, args.firebase_auth_token, args.firebase_pool_size)
+    db_backend = storage_backend.SqliteBackend(args.db_synchronous)
     with contextlib.closing(
-            db_store.open_or_create_db(args.db_file)) as db_connection:
-        record_processor = create_record_processor(db_connection, record_queue)
+            db_store.open_or_create_db(args.db_file,
+                                       db_backend)) as db_connection:
+        record_processor = create_record_processor(
+            db_connection, record_queue, args.commit_batch_size,
+            commit_interval, journal, args.raw_retention_days,
+            args.hourly_retention_days)
+        cloud_uploads = make_upload_worker(
+            firebase_client, args.upload_queue_file,
+            args.upload_queue_max_kb * 1024)
+        health_monitor = make_health_monitor(
+            cloud_uploads, args.health_root,
+            datetime.timedelta(seconds=args.health_interval_s))
+        sync_thread = make_cloud_sync(
+            firebase_client, args.firebase_root,
+            datetime.timedelta(seconds=args.sync_interval_s),
+            args.sync_batch_size, args.db_file, args.db_synchronous,
+            commit_interval)
         solenoid_manager = make_solenoid_manager(
             args.moisture_threshold,
             sleep_windows.parse(args.sleep_window),
@@ -192,58 +544,64 @@ def main(args):
         databus = make_sensor_databus(
             datetime.timedelta(minutes=args.databus_interval),
             datetime.timedelta(minutes=args.photo_interval),
-            record_queue,
+            journaled_record_queue,
             local_temperature_sensor,
             local_humidity_sensor,
             local_soil_moisture_sensor,
             local_light_sensor,
             camera_manager,
             solenoid_manager)
+        signal.signal(signal.SIGTERM,
+                      lambda signum, frame: record_processor.stop())
+        if args.run_seconds:
+            stop_timer = threading.Timer(args.run_seconds,
+                                         record_processor.stop)
+            stop_timer.daemon = True
+            stop_timer.start()
+        start_time = time.time()
         try:
+            relay.start()
             for current_databus in databus:
                 current_databus.start_databusing_async()
-            while True:
-                if not record_processor.try_process_next_record():
-                    time.sleep(0.1)
+            if cloud_uploads:
+                cloud_uploads.start_async()
+            if health_monitor:
+                health_monitor.start_async()
+            if sync_thread:
+                sync_thread.start_async()
+            record_processor.run()
         except KeyboardInterrupt:
             logger.info('Caught keyboard interrupt. Exiting.')
         finally:
             for current_databus in databus:
                 current_databus.close()
+            elapsed = time.time() - start_time
+            logger.info('stored %d record(s) in %.1f s (%.1f records/s)',
+                        record_processor.processed_count, elapsed,
+                        record_processor.processed_count / max(elapsed, 1e-9))
+            if sync_thread:
+                sync_thread.close()
+            if health_monitor:
+                health_monitor.close()
+            if cloud_uploads:
+                cloud_uploads.close()
+                logger.info('uploaded %d and dropped %d cloud write(s), '
+                            '%d left queued; %d request(s) failed',
+                            cloud_uploads.uploaded_count,
+                            cloud_uploads.dropped_count,
+                            cloud_uploads.queue_depth,
+                            cloud_uploads.failed_count)
+            if firebase_client:
+                firebase_client.close()
+            logger.info('record queue spilled %d and replayed %d record(s)',
+                        record_queue.spilled_count,
+                        record_queue.replayed_count)
+            record_queue.close()
+            journal.close()
+            relay.close()
             raspberry_pi_io.close()
 
 
-# infinite loop
-while True:
-    if GPIO.input(27, GPIO.HIGH):
-        GPIO.output(2, GPIO.HIGH)
-        time.sleep(.50)
-    elif GPIO.input(22, GPIO.HIGH):
-        GPIO.output(3, GPIO.HIGH)
-        time.sleep(.50)
-    elif GPIO.input(23, GPIO.HIGH):
-        GPIO.output(4, GPIO.HIGH)
-        time.sleep(.50)
-    elif GPIO.input(24, GPIO.HIGH):
-        GPIO.output(14, GPIO.HIGH)
-        time.sleep(.50)
-    else:
-        GPIO.output(2, GPIO.LOW)
-        GPIO.output(3, GPIO.LOW)
-        GPIO.output(4, GPIO.LOW)
-        GPIO.output(14, GPIO.LOW)
-        GPIO.cleanup
-
-#  firebase.post("/raspberry-pi-2/health-monitor/cpu-temp", cpuTp)
-#  firebase.post("/raspberry-pi-2/sensors/ultrasonic", distance)
-#  firebase.post("/raspberry-pi-2/health-monitor/cpu-core0-usage", cpuCore[0])
-# firebase.post("/raspberry-pi-2/health-monitor/cpu-core1-usage", cpuCore[1])
-# firebase.post("/raspberry-pi-2/health-monitor/cpu-core2-usage", cpuCore[2])
-# firebase.post("/raspberry-pi-2/health-monitor/cpu-core3-usage", cpuCore[3])         
-
-# GPIO.add_event_detect(GPIO.BOTH, bouncetime=300)  # let us know when the pin goes HIGH or LOW
-# GPIO.add_event_callback(CHANNEL_BINDING_TYPES, callback)  # assign function to GPIO PIN, Run function on change
-
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         prog='gardenpi',
@@ -260,6 +618,18 @@ if __name__ == '__main__':
         type=float,
         help='Max number of hours between plant waterings',
         default=(7 * 24))
+    parser.add_argument(
+        '-p',
+        '--databus_interval',
+        type=float,
+        help='Number of minutes between each sensor reading',
+        default=15)
+    parser.add_argument(
+        '--camera_rotation',
+        type=int,
+        choices=(0, 90, 180, 270),
+        help='Specifies the amount to rotate the camera\'s image',
+        default=0)
     parser.add_argument(
         '-c',
         '--config_file',
@@ -285,6 +655,12 @@ if __name__ == '__main__':
         '--db_file',
         help='Location to store gardenpi database file',
         default='gardenpi/gardenpi.db')
+    parser.add_argument(
+        '--db_synchronous',
+        choices=['OFF', 'NORMAL', 'FULL', 'EXTRA'],
+        help=('SQLite synchronous setting for the database file. FULL makes '
+              'every commit durable across power loss'),
+        default='FULL')
     parser.add_argument(
         '-m',
         '--moisture_threshold',
@@ -292,6 +668,178 @@ if __name__ == '__main__':
         help=('Moisture threshold to start solenoid. The solenoid will turn on if the '
               'moisture level drops below this level'),
         default=0)
+    parser.add_argument(
+        '--solenoid_amount',
+        type=int,
+        help='Amount of time (in ms) to run the solenoid each time it runs',
+        default=solenoid.DEFAULT_solenoid_AMOUNT)
+    parser.add_argument(
+        '--soil_moisture_samples',
+        type=int,
+        help=('Number of ADC samples to combine into each soil moisture '
+              'reading'),
+        default=5)
+    parser.add_argument(
+        '--soil_moisture_filter',
+        choices=[sensors.MEDIAN, sensors.TRIMMED_MEAN],
+        help='How to combine soil moisture samples into one reading',
+        default=sensors.MEDIAN)
+    parser.add_argument(
+        '--soil_moisture_settle_ms',
+        type=float,
+        help=('Number of ms to wait after powering the soil moisture sensor '
+              'before sampling it'),
+        default=0)
+    parser.add_argument(
+        '--relay_bouncetime_ms',
+        type=int,
+        help=('Input pin level changes within this many ms of the previous '
+              'change are ignored as switch bounce'),
+        default=300)
+    parser.add_argument(
+        '--queue_capacity',
+        type=int,
+        help=('Maximum number of records to hold in memory before spilling '
+              'them to disk'),
+        default=1000)
+    parser.add_argument(
+        '--spill_file',
+        help='Location to store records that overflow the record queue',
+        default='gardenpi/record_spill.dat')
+    parser.add_argument(
+        '--journal_file',
+        help=('Path prefix of the files in which to journal records until '
+              'they are committed'),
+        default='gardenpi/record_journal.dat')
+    parser.add_argument(
+        '--commit_batch_size',
+        type=int,
+        help=('Maximum number of sensor readings to write to the database in '
+              'a single commit'),
+        default=20)
+    parser.add_argument(
+        '--commit_interval_ms',
+        type=float,
+        help=('Maximum number of milliseconds a sensor reading may wait before '
+              'it is committed to the database'),
+        default=5000)
+    parser.add_argument(
+        '--raw_retention_days',
+        type=float,
+        help=('Number of days to keep raw sensor readings (e.g. 30). Readings '
+              'are kept forever if unset'),
+        default=None)
+    parser.add_argument(
+        '--hourly_retention_days',
+        type=float,
+        help=('Number of days to keep hourly sensor summaries (e.g. 730). '
+              'Summaries are kept forever if unset'),
+        default=None)
+    parser.add_argument(
+        '--firebase_url',
+        help=('Root URL of the Firebase Realtime Database to upload to. '
+              'Cloud uploads are disabled if empty'),
+        default='https://garden-data-827b1-default-rtdb.firebaseio.com')
+    parser.add_argument(
+        '--firebase_auth_token',
+        help='Database secret or ID token to authenticate to Firebase with',
+        default=None)
+    parser.add_argument(
+        '--firebase_pool_size',
+        type=int,
+        help='Maximum number of keep-alive connections to Firebase',
+        default=2)
+    parser.add_argument(
+        '--upload_queue_file',
+        help='Location to keep cloud writes until they are sent',
+        default='gardenpi/upload_queue.dat')
+    parser.add_argument(
+        '--upload_queue_max_kb',
+        type=int,
+        help=('Maximum size of the cloud write queue file, in KiB. The oldest '
+              'writes are dropped once it is full'),
+        default=8 * 1024)
+    parser.add_argument(
+        '--firebase_root',
+        help='Firebase path under which to store synced readings',
+        default='raspberry-pi-2/sensors')
+    parser.add_argument(
+        '--health_root',
+        help='Firebase path under which to post CPU health samples',
+        default='raspberry-pi-2/health-monitor')
+    parser.add_argument(
+        '--health_interval_s',
+        type=float,
+        help='Number of seconds between CPU health samples',
+        default=60)
+    parser.add_argument(
+        '--sync_interval_s',
+        type=float,
+        help='Number of seconds between syncs to Firebase',
+        default=60)
+    parser.add_argument(
+        '--sync_batch_size',
+        type=int,
+        help='Maximum number of readings to upload to Firebase per request',
+        default=500)
+    parser.add_argument(
+        '--run_seconds',
+        type=float,
+        help=('Number of seconds to run before shutting down, for measuring '
+              'throughput. Runs until stopped if unset'),
+        default=None)
+    parser.add_argument(
+        '--simulate',
+        action='store_true',
+        help=('Run against simulated hardware instead of the Pi\'s. On by '
+              'default if %s is set' % hardware_sim.ENVIRONMENT_VARIABLE),
+        default=hardware_sim.enabled())
+    parser.add_argument(
+        '--sim_gpio_latency_ms',
+        type=float,
+        help=('Number of ms each simulated GPIO call takes. Only used with '
+              '--simulate'),
+        default=0)
+    parser.add_argument(
+        '--sim_adc_latency_ms',
+        type=float,
+        help='Number of ms each simulated ADC read takes',
+        default=0.1)
+    parser.add_argument(
+        '--sim_dht11_latency_ms',
+        type=float,
+        help='Number of ms each simulated DHT11 read takes',
+        default=250)
+    parser.add_argument(
+        '--sim_camera_latency_ms',
+        type=float,
+        help='Number of ms each simulated photo takes',
+        default=500)
+    parser.add_argument(
+        '--sim_soil_moisture',
+        help=('Comma-separated raw ADC values for the simulated soil moisture '
+              'sensor to repeat. Random if unset'),
+        default=None)
+    parser.add_argument(
+        '--sim_light',
+        help=('Comma-separated raw ADC values for the simulated light sensor '
+              'to repeat. Random if unset'),
+        default=None)
+    parser.add_argument(
+        '--sim_temperature',
+        help=('Comma-separated temperatures (in degrees Celsius) for the '
+              'simulated DHT11 to repeat. Random if unset'),
+        default=None)
+    parser.add_argument(
+        '--sim_humidity',
+        help=('Comma-separated relative humidities (in percent) for the '
+              'simulated DHT11 to repeat. Random if unset'),
+        default=None)
+    parser.add_argument(
+        '--sim_seed',
+        type=int,
+        help='Seed for the simulated sensors\' random signals',
+        default=None)
     parser.add_argument(
         '-v', '--verbose', action='store_true', help='Use verbose logging')
     main(parser.parse_args())
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""Measures how long gardenpi takes to start.
+
+Times importing garden in a fresh interpreter, then times the hardware init
+phase against simulated GPIO in which every call costs a fixed amount of
+time. The init phase is timed both as the bulk setup main does and as the
+pin-by-pin setup it replaced. Usage:
+
+    python garden_startup_benchmark.py [--repeat R] [--gpio_call_us US]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import garden
+import hardware_sim
+
+_IMPORT_SCRIPT = ('import time; start = time.time(); import garden; '
+                  'print(time.time() - start)')
+
+
+def _time_import(repeat):
+    """Returns the fastest of repeat imports of garden, in seconds."""
+    environment = dict(os.environ)
+    environment[hardware_sim.ENVIRONMENT_VARIABLE] = '1'
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return min(
+        float(subprocess.check_output([sys.executable, '-c', _IMPORT_SCRIPT],
+                                      cwd=directory, env=environment))
+        for _ in range(repeat))
+
+
+def _init_pin_by_pin(gpio, wiring_config):
+    """Sets up the pins one call at a time, the way import time used to."""
+    gpio.setmode(gpio.BCM)
+    gpio_pins = wiring_config.gpio_pins
+    output_pins = ([gpio_pins.soil_moisture, gpio_pins.solenoid] +
+                   sorted(wiring_config.relay_pins.values()) +
+                   list(wiring_config.extra_output_pins))
+    for pin in output_pins:
+        gpio.setup(pin, gpio.OUT)
+    for pin in sorted(wiring_config.relay_pins):
+        gpio.setup(pin, gpio.IN)
+    for pin in output_pins:
+        gpio.output(pin, gpio.LOW)
+
+
+def _time_init(label, init_function, wiring_config, call_latency, repeat):
+    best = None
+    for _ in range(repeat):
+        gpio = hardware_sim.SimulatedGpio(call_latency=call_latency)
+        start = time.time()
+        init_function(gpio, wiring_config)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print('%-28s %7.3f ms  %3d GPIO call(s)' % (label, best * 1000,
+                                                 gpio.call_count))
+
+
+def main(args):
+    wiring_config = garden.read_wiring_config(args.config_file)
+    call_latency = args.gpio_call_us / 1e6
+
+    print('%-28s %7.3f ms' % ('import garden',
+                              _time_import(args.repeat) * 1000))
+    _time_init('pin-by-pin setup', _init_pin_by_pin, wiring_config,
+               call_latency, args.repeat)
+    _time_init('bulk setup (init_hardware)', garden.init_hardware,
+               wiring_config, call_latency, args.repeat)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='garden_startup_benchmark',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        '--repeat', type=int, help='Number of times to time each phase',
+        default=5)
+    parser.add_argument(
+        '--gpio_call_us',
+        type=float,
+        help='Number of microseconds each simulated GPIO call takes',
+        default=500)
+    parser.add_argument(
+        '--config_file',
+        help='Wiring config file',
+        default='wiring_config.ini')
+    main(parser.parse_args())
@@ -0,0 +1,323 @@
+"""Simulated Raspberry Pi hardware, for running gardenpi off the Pi.
+
+Stands in for the RPi.GPIO module, the MCP3008 ADC, the Adafruit_DHT driver
+and the Pi camera with objects that have the same interfaces. Sensor values
+come from signal generators, either scripted sequences or random walks, and
+every read can be made to take a fixed time so that the rest of the stack
+sees roughly the timing it would on the Pi.
+
+Simulation is selected with gardenpi's --simulate flag, which defaults to
+on when the GARDENPI_SIMULATE environment variable is set to anything other
+than an empty string or 0.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ENVIRONMENT_VARIABLE = 'GARDENPI_SIMULATE'
+
+# Largest value a 10-bit MCP3008 channel reports.
+_ADC_MAX_VALUE = 1023
+
+
+def enabled():
+    """Returns True if the environment asks for simulated hardware."""
+    return os.environ.get(ENVIRONMENT_VARIABLE, '') not in ('', '0')
+
+
+def load_gpio(simulate, read_latency=0.0, call_latency=0.0):
+    """Returns the GPIO module to drive the pins with.
+    RPi.GPIO is only imported here, so that importing gardenpi's modules
+    never touches the hardware.
+    Args:
+        simulate: True for a SimulatedGpio, False for RPi.GPIO.
+        read_latency: Number of seconds each simulated input() call takes.
+        call_latency: Number of seconds every other simulated call takes.
+    """
+    if simulate:
+        logger.info('using simulated GPIO')
+        return SimulatedGpio(read_latency, call_latency)
+    import RPi.GPIO
+    return RPi.GPIO
+
+
+def _wait(seconds):
+    if seconds > 0.0:
+        time.sleep(seconds)
+
+
+class ScriptedSignal(object):
+    """Produces a fixed sequence of values, repeating it forever."""
+
+    def __init__(self, values):
+        """Creates a new ScriptedSignal.
+        Args:
+            values: Non-empty sequence of values to produce, in order.
+        Raises:
+            ValueError: values is empty.
+        """
+        if not values:
+            raise ValueError('A scripted signal needs at least one value')
+        self._values = list(values)
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def next_value(self):
+        with self._lock:
+            value = self._values[self._index]
+            self._index = (self._index + 1) % len(self._values)
+        return value
+
+
+class RandomWalkSignal(object):
+    """Produces values that drift randomly between a minimum and maximum."""
+
+    def __init__(self, start, step, minimum, maximum, seed=None):
+        """Creates a new RandomWalkSignal.
+        Args:
+            start: First value to produce.
+            step: Largest change between consecutive values.
+            minimum: Smallest value to produce.
+            maximum: Largest value to produce.
+            seed: Seed for the random number generator, to make runs
+                repeatable, or None.
+        """
+        self._value = float(start)
+        self._step = step
+        self._minimum = minimum
+        self._maximum = maximum
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next_value(self):
+        with self._lock:
+            value = self._value
+            self._value = min(self._maximum, max(
+                self._minimum,
+                self._value + self._random.uniform(-self._step, self._step)))
+        return value
+
+
+def parse_signal(script, default):
+    """Creates a signal from a command-line script.
+    Args:
+        script: Comma-separated values to repeat, such as "300,320,900", or
+            an empty string or None for the default signal.
+        default: Signal to return if script is empty.
+    Returns:
+        A ScriptedSignal of the script's values, or default.
+    Raises:
+        ValueError: script holds a value that is not a number.
+    """
+    if not script:
+        return default
+    return ScriptedSignal([float(value) for value in script.split(',')])
+
+
+class SimulatedGpio(object):
+    """Stands in for the RPi.GPIO module.
+    Output pins hold whatever level was last written to them. Input pins read
+    low until set_input() changes them, which also runs their edge
+    callbacks.
+    """
+
+    BCM = 11
+    BOARD = 10
+    IN = 1
+    OUT = 0
+    LOW = 0
+    HIGH = 1
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+
+    def __init__(self, read_latency=0.0, call_latency=0.0):
+        """Creates a new SimulatedGpio.
+        Args:
+            read_latency: Number of seconds each input() call takes.
+            call_latency: Number of seconds every other call takes, whether
+                it is given one channel or a list of them.
+        """
+        self._read_latency = read_latency
+        self._call_latency = call_latency
+        self._lock = threading.Lock()
+        self._mode = None
+        self._directions = {}
+        self._levels = {}
+        self._edge_callbacks = {}
+        self.call_count = 0
+
+    def setwarnings(self, flag):
+        self._call()
+
+    def setmode(self, mode):
+        self._call()
+        self._mode = mode
+
+    def getmode(self):
+        return self._mode
+
+    def setup(self, channels, direction, pull_up_down=None, initial=None):
+        self._call()
+        if self._mode is None:
+            raise RuntimeError('Please set pin numbering mode using '
+                               'GPIO.setmode(GPIO.BOARD) or '
+                               'GPIO.setmode(GPIO.BCM)')
+        with self._lock:
+            for channel in self._channels(channels):
+                self._directions[channel] = direction
+                if direction == self.OUT:
+                    self._levels[channel] = initial or self.LOW
+                else:
+                    self._levels.setdefault(channel, self.LOW)
+
+    def output(self, channels, values):
+        self._call()
+        channels = self._channels(channels)
+        if not isinstance(values, (list, tuple)):
+            values = [values] * len(channels)
+        with self._lock:
+            for channel, value in zip(channels, values):
+                if self._directions.get(channel) != self.OUT:
+                    raise RuntimeError(
+                        'The GPIO channel has not been set up as an OUTPUT')
+                self._levels[channel] = self.HIGH if value else self.LOW
+
+    def input(self, channel):
+        _wait(self._read_latency)
+        with self._lock:
+            if channel not in self._directions:
+                raise RuntimeError(
+                    'You must setup() the GPIO channel first')
+            return self._levels[channel]
+
+    def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+        self._call()
+        with self._lock:
+            if self._directions.get(channel) != self.IN:
+                raise RuntimeError(
+                    'You must setup() the GPIO channel as an input first')
+            self._edge_callbacks[channel] = callback
+
+    def remove_event_detect(self, channel):
+        self._call()
+        with self._lock:
+            self._edge_callbacks.pop(channel, None)
+
+    def cleanup(self, channels=None):
+        self._call()
+        with self._lock:
+            if channels is None:
+                channels = list(self._directions)
+            for channel in self._channels(channels):
+                self._directions.pop(channel, None)
+                self._levels.pop(channel, None)
+                self._edge_callbacks.pop(channel, None)
+
+    def set_input(self, channel, level):
+        """Drives an input pin to a level, as the outside world would.
+        Runs the pin's edge callback, if it has one and the level changed.
+        """
+        with self._lock:
+            changed = self._levels.get(channel) != level
+            self._levels[channel] = level
+            callback = self._edge_callbacks.get(channel)
+        if changed and callback:
+            callback(channel)
+
+    def set_input_without_edge(self, channel, level):
+        """Drives an input pin to a level without running its edge callback.
+        Simulates an edge that the GPIO library dropped, such as one that
+        arrives within the bounce window of the edge before it.
+        """
+        with self._lock:
+            self._levels[channel] = level
+
+    def level(self, channel):
+        """Returns the level last written to or set on a pin."""
+        with self._lock:
+            return self._levels.get(channel)
+
+    def _call(self):
+        self.call_count += 1
+        _wait(self._call_latency)
+
+    @staticmethod
+    def _channels(channels):
+        if isinstance(channels, (list, tuple)):
+            return list(channels)
+        return [channels]
+
+
+class SimulatedAdc(object):
+    """Stands in for an Adafruit_MCP3008.MCP3008 instance."""
+
+    def __init__(self, signals, read_latency=0.0):
+        """Creates a new SimulatedAdc.
+        Args:
+            signals: A dict that maps each ADC channel to the signal that
+                produces its values. Other channels read 0.
+            read_latency: Number of seconds each read_adc() call takes.
+        """
+        self._signals = dict(signals)
+        self._read_latency = read_latency
+
+    def read_adc(self, adc_number):
+        _wait(self._read_latency)
+        signal = self._signals.get(adc_number)
+        if not signal:
+            return 0
+        return int(min(_ADC_MAX_VALUE, max(0, round(signal.next_value()))))
+
+
+class SimulatedDhtDriver(object):
+    """Stands in for the Adafruit_DHT module."""
+
+    DHT11 = 11
+    DHT22 = 22
+    AM2302 = 22
+
+    def __init__(self, humidity_signal, temperature_signal, read_latency=0.0):
+        """Creates a new SimulatedDhtDriver.
+        Args:
+            humidity_signal: Signal that produces relative humidity values,
+                in percent.
+            temperature_signal: Signal that produces temperature values, in
+                degrees Celsius.
+            read_latency: Number of seconds each read takes. A real DHT11
+                takes a few hundred ms and more when it has to retry.
+        """
+        self._humidity_signal = humidity_signal
+        self._temperature_signal = temperature_signal
+        self._read_latency = read_latency
+
+    def read_retry(self, sensor, pin):
+        """Returns a (humidity, temperature) tuple, like Adafruit_DHT."""
+        _wait(self._read_latency)
+        return (self._humidity_signal.next_value(),
+                self._temperature_signal.next_value())
+
+
+class SimulatedCamera(object):
+    """Stands in for a picamera.PiCamera instance."""
+
+    def __init__(self, capture_latency=0.0):
+        """Creates a new SimulatedCamera.
+        Args:
+            capture_latency: Number of seconds each capture() call takes.
+        """
+        self.rotation = 0
+        self._capture_latency = capture_latency
+
+    def capture(self, output):
+        """Writes an empty image file to the path output."""
+        _wait(self._capture_latency)
+        open(output, 'wb').close()
@@ -0,0 +1,199 @@
+"""Samples the Raspberry Pi's CPU temperature and per-core CPU usage."""
+
+import calendar
+import glob
+import logging
+import os
+import re
+import subprocess
+import threading
+
+import clock
+
+logger = logging.getLogger(__name__)
+
+_THERMAL_ZONE_GLOB = '/sys/class/thermal/thermal_zone*/temp'
+_PROC_STAT_PATH = '/proc/stat'
+_VCGENCMD_PATTERN = re.compile(r'temp=([-\d.]+)')
+# Number of bytes to read per pread from a kept-open file.
+_READ_SIZE = 4096
+# Fields of a /proc/stat cpu line that count time spent idle (idle, iowait).
+_IDLE_FIELDS = (3, 4)
+# Number of leading /proc/stat cpu fields that add up to total time. The
+# guest fields after them are already counted in user and nice.
+_TOTAL_FIELDS = 8
+
+
+def _pread(fd, size, offset):
+    if hasattr(os, 'pread'):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def _read_all(fd):
+    """Reads a kept-open file from its start without moving a file offset."""
+    chunks = []
+    offset = 0
+    while True:
+        chunk = _pread(fd, _READ_SIZE, offset)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        offset += len(chunk)
+    return b''.join(chunks)
+
+
+def _open_first(paths):
+    """Opens the first readable path. Returns its fd and path, or Nones."""
+    for path in paths:
+        try:
+            return os.open(path, os.O_RDONLY), path
+        except OSError:
+            continue
+    return None, None
+
+
+class HealthSampler(object):
+    """Reads CPU health from sysfs and procfs through kept-open files.
+    Each sample is one pread on a file opened once, instead of a process
+    spawn or an open/read/close per sample. CPU temperature falls back to
+    running vcgencmd only if sysfs has no thermal zone.
+    """
+
+    def __init__(self, thermal_paths=None, proc_stat_path=_PROC_STAT_PATH):
+        """Creates a new HealthSampler.
+        Args:
+            thermal_paths: Candidate thermal zone temp files, tried in order.
+                Defaults to every /sys/class/thermal/thermal_zone*/temp.
+            proc_stat_path: Path to the kernel's CPU statistics file.
+        """
+        if thermal_paths is None:
+            thermal_paths = sorted(glob.glob(_THERMAL_ZONE_GLOB))
+        self._thermal_fd, thermal_path = _open_first(thermal_paths)
+        self._has_vcgencmd = True
+        if self._thermal_fd is None:
+            logger.info('no thermal zone in sysfs, falling back to vcgencmd')
+        else:
+            logger.info('reading CPU temperature from %s', thermal_path)
+        self._stat_fd, _ = _open_first([proc_stat_path])
+        self._previous_times = None
+        # Takes the baseline for the first usage sample.
+        self.cpu_core_usage()
+
+    def cpu_temperature(self):
+        """Returns the CPU temperature in degrees Celsius, or None if no
+        source of it is available.
+        """
+        if self._thermal_fd is not None:
+            # The file holds millidegrees Celsius.
+            return int(_pread(self._thermal_fd, 32, 0)) / 1000.0
+        if not self._has_vcgencmd:
+            return None
+        try:
+            output = subprocess.check_output(['vcgencmd', 'measure_temp'])
+        except OSError as e:
+            logger.warning('could not run vcgencmd, CPU temperature is '
+                           'unavailable: %s', e)
+            self._has_vcgencmd = False
+            return None
+        except subprocess.CalledProcessError as e:
+            logger.warning('vcgencmd failed: %s', e)
+            return None
+        match = _VCGENCMD_PATTERN.search(output.decode('ascii', 'replace'))
+        if not match:
+            return None
+        return float(match.group(1))
+
+    def cpu_core_usage(self):
+        """Returns the usage of each CPU core since the previous call.
+        Returns:
+            A list with each core's busy time as a percentage, in core order,
+            or an empty list if CPU statistics are unavailable.
+        """
+        if self._stat_fd is None:
+            return []
+        times = []
+        for line in _read_all(self._stat_fd).decode('ascii').splitlines():
+            # Per-core lines are cpu0, cpu1, ...; the bare cpu line is the
+            # total over all cores.
+            if line.startswith('cpu') and line[3:4].isdigit():
+                fields = [int(field) for field in line.split()[1:]]
+                idle = sum(fields[i] for i in _IDLE_FIELDS)
+                times.append((idle, sum(fields[:_TOTAL_FIELDS])))
+        previous_times = self._previous_times or [(0, 0)] * len(times)
+        self._previous_times = times
+        usage = []
+        for (idle, total), (previous_idle, previous_total) in zip(
+                times, previous_times):
+            elapsed = total - previous_total
+            if elapsed <= 0:
+                usage.append(0.0)
+            else:
+                usage.append(100.0 * (elapsed - (idle - previous_idle)) /
+                             elapsed)
+        return usage
+
+    def close(self):
+        for fd in (self._thermal_fd, self._stat_fd):
+            if fd is not None:
+                os.close(fd)
+        self._thermal_fd = self._stat_fd = None
+
+
+class HealthMonitor(object):
+    """Periodically uploads health samples on a background thread."""
+
+    def __init__(self, sampler, cloud_uploads, root_path, interval,
+                 utc_clock=None):
+        """Creates a new HealthMonitor.
+        Args:
+            sampler: HealthSampler to take samples with.
+            cloud_uploads: UploadWorker to queue the samples on.
+            root_path: Database path under which to post the samples.
+            interval: Amount of time (as a timedelta) between samples.
+            utc_clock: Clock interface used to timestamp samples. Defaults to
+                a UTC clock.
+        """
+        self._sampler = sampler
+        self._cloud_uploads = cloud_uploads
+        self._root_path = root_path
+        self._interval_seconds = interval.total_seconds()
+        self._clock = utc_clock or clock.Clock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        """Takes one sample of every health value and queues its upload."""
+        timestamp = calendar.timegm(self._clock.now().utctimetuple())
+        values = [('cpu-temp', self._sampler.cpu_temperature())]
+        for core, usage in enumerate(self._sampler.cpu_core_usage()):
+            values.append(('cpu-core%d-usage' % core, usage))
+        for name, value in values:
+            if value is None:
+                continue
+            self._cloud_uploads.post('%s/%s' % (self._root_path, name),
+                                     {'timestamp': timestamp, 'value': value})
+
+    def start_async(self):
+        """Starts sampling on a background thread."""
+        self._thread = threading.Thread(target=self._run,
+                                        name='health-monitor')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """Stops sampling and closes the sampler."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self._sampler.close()
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except (OSError, ValueError) as e:
+                logger.warning('failed to sample CPU health: %s', e)
+            if self._stop_event.wait(self._interval_seconds):
+                break
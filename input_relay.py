@@ -0,0 +1,98 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Edges within this many ms of the previous edge on a pin are switch bounce.
+_DEFAULT_BOUNCETIME_MS = 300
+
+
+class InputRelay(object):
+    """Drives output pins from the level of input pins.
+    Each output pin follows its input pin: it turns on when the input goes high
+    (a button press or a float switch closing) and off when the input goes low.
+    Level changes arrive as edge callbacks from the GPIO library, so the relay
+    uses no CPU between them and reacts as soon as the kernel sees the edge.
+    The GPIO library drops every edge inside the bounce window, including the
+    one the contact settles on, so the relay reads the input again once the
+    window has passed and drives the output from that settled level.
+    """
+
+    def __init__(self, pi_io, pin_map, bouncetime_ms=_DEFAULT_BOUNCETIME_MS):
+        """Creates a new InputRelay.
+        Args:
+            pi_io: Raspberry Pi I/O interface.
+            pin_map: A dict that maps each input pin to the output pin it
+                drives.
+            bouncetime_ms: Edges within this many ms of the previous edge on
+                the same input are ignored as switch bounce.
+        """
+        self._pi_io = pi_io
+        self._pin_map = dict(pin_map)
+        self._bouncetime_ms = bouncetime_ms
+        self._lock = threading.Lock()
+        # Maps each input pin to the timer that rereads it after a bounce.
+        self._settle_timers = {}
+        self._closed = False
+
+    def start(self):
+        """Sets every output to its input's level and starts following them."""
+        for input_pin in self._pin_map:
+            self._pi_io.add_edge_callback(input_pin, self._on_edge,
+                                          self._bouncetime_ms)
+            self._follow(input_pin)
+        logger.info('relaying input pins to output pins: %s',
+                    ', '.join('%d->%d' % pins
+                              for pins in sorted(self._pin_map.items())))
+
+    def close(self):
+        """Stops following the inputs and turns every output off."""
+        for input_pin in self._pin_map:
+            self._pi_io.remove_edge_callback(input_pin)
+        # Once closed is set under the lock, no settle timer can drive an
+        # output, including one that is already running.
+        with self._lock:
+            self._closed = True
+            for timer in self._settle_timers.values():
+                timer.cancel()
+            self._settle_timers.clear()
+        for output_pin in self._pin_map.values():
+            self._pi_io.turn_pin_off(output_pin)
+
+    def _on_edge(self, input_pin):
+        # Edges during the bounce window are dropped, so read the input again
+        # once it has passed. A later edge restarts the wait.
+        timer = threading.Timer(self._bouncetime_ms / 1000.0, self._on_settle,
+                                [input_pin])
+        timer.daemon = True
+        with self._lock:
+            # The GPIO event thread may still deliver an edge while close()
+            # runs, and it must not turn an output back on afterwards.
+            if self._closed:
+                return
+            self._follow(input_pin)
+            previous_timer = self._settle_timers.get(input_pin)
+            self._settle_timers[input_pin] = timer
+            timer.start()
+        if previous_timer:
+            previous_timer.cancel()
+
+    def _on_settle(self, input_pin):
+        with self._lock:
+            if self._closed:
+                return
+            self._follow(input_pin)
+            # This runs on the timer's own thread. A later edge may already
+            # have replaced the timer with a new one.
+            timer = threading.current_thread()
+            if self._settle_timers.get(input_pin) is timer:
+                del self._settle_timers[input_pin]
+
+    def _follow(self, input_pin):
+        # Read the level rather than infer it from the edge, since bounce can
+        # deliver edges out of step with the level the input settles at.
+        output_pin = self._pin_map[input_pin]
+        if self._pi_io.read_pin(input_pin):
+            self._pi_io.turn_pin_on(output_pin)
+        else:
+            self._pi_io.turn_pin_off(output_pin)
@@ -0,0 +1,50 @@
+import threading
+import unittest
+
+import hardware_sim
+import input_relay
+import pi_io
+
+_INPUT_PIN = 27
+_OUTPUT_PIN = 2
+_BOUNCETIME_MS = 20
+
+
+class InputRelayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.gpio = hardware_sim.SimulatedGpio()
+        self.relay = input_relay.InputRelay(pi_io.IO(self.gpio),
+                                            {_INPUT_PIN: _OUTPUT_PIN},
+                                            _BOUNCETIME_MS)
+        self.relay.start()
+
+    def tearDown(self):
+        self.relay.close()
+
+    def _wait_out_bounce(self):
+        threading.Event().wait(_BOUNCETIME_MS * 3 / 1000.0)
+
+    def test_output_follows_input(self):
+        self.gpio.set_input(_INPUT_PIN, self.gpio.HIGH)
+        self.assertEqual(self.gpio.HIGH, self.gpio.level(_OUTPUT_PIN))
+        self.gpio.set_input(_INPUT_PIN, self.gpio.LOW)
+        self.assertEqual(self.gpio.LOW, self.gpio.level(_OUTPUT_PIN))
+
+    def test_output_follows_level_input_settles_at(self):
+        self.gpio.set_input(_INPUT_PIN, self.gpio.HIGH)
+        # The contact bounces back low inside the bounce window, so the GPIO
+        # library drops the edge and no callback runs.
+        self.gpio.set_input_without_edge(_INPUT_PIN, self.gpio.LOW)
+        self._wait_out_bounce()
+        self.assertEqual(self.gpio.LOW, self.gpio.level(_OUTPUT_PIN))
+
+    def test_close_turns_output_off(self):
+        self.gpio.set_input(_INPUT_PIN, self.gpio.HIGH)
+        self.relay.close()
+        self._wait_out_bounce()
+        self.assertEqual(self.gpio.LOW, self.gpio.level(_OUTPUT_PIN))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,9 @@
+import contextlib
+import threading
+
+import clock
+
+
 class IO(object):
     """Wrapper for input and output on a Raspberry Pi board.
     This wraps the board and allows the caller to read or send signals to
@@ -5,14 +11,40 @@ class IO(object):
     exist at any given time.
     """
 
-    def __init__(self, gpio):
+    def __init__(self, gpio, settle_clock=None):
         """Creates a new input/output wrapper.
         Args:
             gpio: Raspberry Pi GPIO module.
+            settle_clock: Clock interface used to wait for powered pins to
+                settle. Defaults to a UTC clock.
         """
         self._GPIO = gpio
         self._GPIO.setmode(self._GPIO.BCM)
         self._output_pins = set()
+        self._input_pins = set()
+        self._clock = settle_clock or clock.Clock()
+        self._power_lock = threading.Lock()
+        # Maps each pin held on by power sessions to the number of sessions.
+        self._power_sessions = {}
+
+    def setup_pins(self, output_pins, input_pins):
+        """Sets up pins in bulk, with one GPIO setup call per direction.
+        Output pins start low. Pins set up here are never set up again when
+        they are first used.
+        Args:
+            output_pins: Indexes of Raspberry Pi pins to use as outputs.
+            input_pins: Indexes of Raspberry Pi pins to use as inputs.
+        """
+        output_pins = [pin for pin in output_pins
+                       if pin not in self._output_pins]
+        input_pins = [pin for pin in input_pins if pin not in self._input_pins]
+        if output_pins:
+            self._GPIO.setup(output_pins, self._GPIO.OUT,
+                             initial=self._GPIO.LOW)
+            self._output_pins.update(output_pins)
+        if input_pins:
+            self._GPIO.setup(input_pins, self._GPIO.IN)
+            self._input_pins.update(input_pins)
 
     def turn_pin_on(self, pin):
         """Turns on a Raspberry Pi GPIO pin.
@@ -30,6 +62,65 @@ class IO(object):
         self._ensure_pin_is_output(pin)
         self._GPIO.output(pin, self._GPIO.LOW)
 
+    @contextlib.contextmanager
+    def power_session(self, pin, settle_seconds=0.0):
+        """Keeps a pin on for the duration of a with block.
+        Sessions on the same pin nest and may overlap across threads: the pin
+        turns on, and waits settle_seconds for whatever it powers to settle,
+        only when the first session starts, and turns off only when the last
+        one ends. A batch of reads inside one session pays for a single
+        power cycle and settle time.
+        Args:
+            pin: Index of Raspberry Pi pin to hold on.
+            settle_seconds: Number of seconds to wait after turning the pin on
+                before the block runs.
+        """
+        with self._power_lock:
+            session_count = self._power_sessions.get(pin, 0)
+            if not session_count:
+                self.turn_pin_on(pin)
+                # Sessions that start meanwhile wait on the lock, so none of
+                # them runs before the pin has settled.
+                if settle_seconds:
+                    self._clock.wait(settle_seconds)
+            self._power_sessions[pin] = session_count + 1
+        try:
+            yield
+        finally:
+            with self._power_lock:
+                self._power_sessions[pin] -= 1
+                if not self._power_sessions[pin]:
+                    del self._power_sessions[pin]
+                    self.turn_pin_off(pin)
+
+    def read_pin(self, pin):
+        """Reads the level of a Raspberry Pi GPIO input pin.
+        Args:
+            pin: Index of Raspberry Pi pin to read.
+        Returns:
+            True if the pin is high.
+        """
+        self._ensure_pin_is_input(pin)
+        return bool(self._GPIO.input(pin))
+
+    def add_edge_callback(self, pin, callback, bouncetime_ms):
+        """Calls a function whenever an input pin changes level.
+        The GPIO library detects edges in the kernel and runs callback on its
+        own event thread, so nothing has to poll the pin.
+        Args:
+            pin: Index of Raspberry Pi pin to watch.
+            callback: Function that takes the index of the pin that changed.
+            bouncetime_ms: Edges within this many ms of the previous edge are
+                ignored as switch bounce.
+        """
+        self._ensure_pin_is_input(pin)
+        self._GPIO.add_event_detect(pin, self._GPIO.BOTH, callback=callback,
+                                    bouncetime=bouncetime_ms)
+
+    def remove_edge_callback(self, pin):
+        """Stops calling the edge callback of an input pin."""
+        self._GPIO.remove_event_detect(pin)
+
     def _ensure_pin_is_output(self, pin):
         """Adds pin to output pin set if it is not already in it."""
         if pin in self._output_pins:
@@ -37,6 +128,13 @@ class IO(object):
         self._GPIO.setup(pin, self._GPIO.OUT)
         self._output_pins.add(pin)
 
+    def _ensure_pin_is_input(self, pin):
+        """Adds pin to input pin set if it is not already in it."""
+        if pin in self._input_pins:
+            return
+        self._GPIO.setup(pin, self._GPIO.IN)
+        self._input_pins.add(pin)
+
     def close(self):
         """Cleans up the Raspberry Pi I/O interface.
         Should be called when use of the I/O interface is complete.
@@ -0,0 +1,228 @@
+import collections
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Each journal entry is a header followed by a pickled record. The header holds
+# the payload length and the CRC-32 of the payload, both big-endian uint32.
+_HEADER = struct.Struct('>II')
+# Default minimum number of seconds between fsyncs of the journal as records
+# are appended. Closing a segment always fsyncs it.
+_DEFAULT_SYNC_INTERVAL_SECONDS = 1.0
+
+
+def _checksum(payload):
+    return zlib.crc32(payload) & 0xffffffff
+
+
+class RecordJournal(object):
+    """Segmented journal of records not yet committed to the database.
+    Every record is appended to the current segment file before it is queued
+    for the record processor. Each store acknowledges its records as it
+    commits them, and each acknowledgement starts a new segment. A segment
+    file is deleted once every record in it has been committed, so the
+    journal stays about as large as the records still waiting for a commit,
+    however steady the load. On startup, replay() returns the records a
+    previous run journaled but never committed. Segments are replayed whole,
+    so records committed alongside an uncommitted one may be stored again.
+    Records are flushed to the operating system as they are appended, so they
+    survive a process crash. Fsyncs, which also make them survive a power
+    cut, are batched: a segment is fsynced when it is closed, and otherwise
+    at most once per sync_interval.
+    Entries are checksummed, so a record torn by a power cut is detected and
+    discarded along with the rest of its segment.
+    Stores commit their records in the order they were journaled, so the
+    journal only has to count, for each record type, how many have been
+    committed.
+    """
+
+    def __init__(self, path, sync=True,
+                 sync_interval=_DEFAULT_SYNC_INTERVAL_SECONDS):
+        """Creates a new RecordJournal.
+        Args:
+            path: Path prefix of the journal's segment files. Each segment is
+                stored at path followed by a dot and the segment number.
+            sync: If True, fsyncs the journal so that records survive a power
+                cut, not just a process crash.
+            sync_interval: Minimum number of seconds between fsyncs of the
+                current segment as records are appended.
+        """
+        self._path = path
+        self._sync = sync
+        self._sync_interval = sync_interval
+        self._lock = threading.Lock()
+        # Each item is a [segment path, Counter of records by type] list. The
+        # last item is the segment currently being appended to.
+        self._segments = collections.deque(
+            [segment_path, collections.Counter()]
+            for segment_path in self._segment_paths())
+        # Records committed but not yet matched against a deleted segment,
+        # counted by type.
+        self._committed = collections.Counter()
+        self._next_segment_number = self._segment_number(
+            self._segments[-1][0]) + 1 if self._segments else 0
+        self._file = None
+        self._dirty = False
+        self._last_sync_time = 0.0
+
+    def replay(self):
+        """Reads the records a previous run left in the journal.
+        Must be called once, before any records are appended. The returned
+        records stay in the journal until they are acknowledged.
+        Returns:
+            A list of records in the order they were journaled.
+        """
+        records = []
+        with self._lock:
+            for segment in self._segments:
+                segment_records = self._read_segment(segment[0])
+                segment[1].update(type(record) for record in segment_records)
+                records.extend(segment_records)
+            self._retire_segments()
+            self._open_segment()
+        if records:
+            logger.info('replaying %d uncommitted record(s) from journal',
+                        len(records))
+        return records
+
+    def append(self, record):
+        """Appends a record to the journal.
+        Args:
+            record: A picklable record.
+        """
+        payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+        entry = _HEADER.pack(len(payload), _checksum(payload)) + payload
+        with self._lock:
+            self._file.write(entry)
+            self._file.flush()
+            self._segments[-1][1][type(record)] += 1
+            self._dirty = True
+            if time.time() - self._last_sync_time >= self._sync_interval:
+                self._fsync()
+
+    def acknowledge(self, count, record_type):
+        """Marks records as committed to the database.
+        Starts a new segment, and deletes every segment whose records have all
+        been committed.
+        Args:
+            count: Number of records that were committed.
+            record_type: Type of the committed records.
+        """
+        with self._lock:
+            self._committed[record_type] += count
+            if sum(self._segments[-1][1].values()):
+                self._open_segment()
+            self._retire_segments()
+
+    def close(self):
+        with self._lock:
+            self._fsync()
+            self._file.close()
+            if not sum(self._segments[-1][1].values()):
+                os.remove(self._segments.pop()[0])
+
+    def _segment_paths(self):
+        """Returns the paths of the existing segment files, oldest first."""
+        directory = os.path.dirname(self._path) or '.'
+        prefix = os.path.basename(self._path) + '.'
+        numbers = sorted(
+            int(name[len(prefix):]) for name in os.listdir(directory)
+            if name.startswith(prefix) and name[len(prefix):].isdigit())
+        return [self._segment_path(number) for number in numbers]
+
+    def _segment_path(self, number):
+        return '%s.%08d' % (self._path, number)
+
+    def _segment_number(self, segment_path):
+        return int(segment_path[len(self._path) + 1:])
+
+    def _open_segment(self):
+        """Fsyncs the current segment, if any, and starts a new one."""
+        if self._file:
+            self._fsync()
+            self._file.close()
+        segment_path = self._segment_path(self._next_segment_number)
+        self._next_segment_number += 1
+        self._file = open(segment_path, 'ab')
+        self._segments.append([segment_path, collections.Counter()])
+
+    def _retire_segments(self):
+        """Deletes the oldest closed segments whose records are committed."""
+        # The segment being appended to, if any, is never deleted.
+        closed_count = len(self._segments) - (self._file is not None)
+        for _ in range(closed_count):
+            segment_path, counts = self._segments[0]
+            if any(self._committed[record_type] < count
+                   for record_type, count in counts.items()):
+                break
+            self._committed.subtract(counts)
+            os.remove(segment_path)
+            self._segments.popleft()
+
+    def _fsync(self):
+        if self._sync and self._dirty:
+            os.fsync(self._file.fileno())
+            self._last_sync_time = time.time()
+        self._dirty = False
+
+    @staticmethod
+    def _read_segment(segment_path):
+        """Reads a segment's records, discarding a torn or corrupt tail."""
+        records = []
+        good_offset = 0
+        with open(segment_path, 'r+b') as segment_file:
+            while True:
+                header = segment_file.read(_HEADER.size)
+                if not header:
+                    return records
+                if len(header) == _HEADER.size:
+                    length, checksum = _HEADER.unpack(header)
+                    payload = segment_file.read(length)
+                    if (len(payload) == length and
+                            _checksum(payload) == checksum):
+                        records.append(pickle.loads(payload))
+                        good_offset = segment_file.tell()
+                        continue
+                logger.warning('discarding corrupt journal entry in %s at '
+                               'offset %d', segment_path, good_offset)
+                segment_file.truncate(good_offset)
+                return records
+
+
+class JournaledQueue(object):
+    """Queue wrapper that journals each record before enqueueing it."""
+
+    def __init__(self, journal, record_queue):
+        """Creates a new JournaledQueue.
+        Args:
+            journal: RecordJournal to which to append records.
+            record_queue: Queue on which to put records once journaled.
+        """
+        self._journal = journal
+        self._record_queue = record_queue
+        self._lock = threading.Lock()
+
+    def put(self, record, block=True, timeout=None):
+        # Queues records in the order they were journaled, which is the order
+        # the journal expects them to be committed in.
+        with self._lock:
+            self._journal.append(record)
+            self._record_queue.put(record, block, timeout)
+
+    def put_nowait(self, record):
+        self.put(record, block=False)
+
+    def get(self, block=True, timeout=None):
+        return self._record_queue.get(block, timeout)
+
+    def get_nowait(self):
+        return self._record_queue.get_nowait()
+
+    def qsize(self):
+        return self._record_queue.qsize()
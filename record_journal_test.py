@@ -0,0 +1,100 @@
+import collections
+import os
+import shutil
+import tempfile
+import unittest
+
+import record_journal
+
+TemperatureRecord = collections.namedtuple('TemperatureRecord',
+                                           ['timestamp', 'temperature'])
+HumidityRecord = collections.namedtuple('HumidityRecord',
+                                        ['timestamp', 'humidity'])
+
+
+class RecordJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'journal.dat')
+        self.fsync_count = 0
+        self._fsync = os.fsync
+
+        def counting_fsync(fd):
+            self.fsync_count += 1
+            self._fsync(fd)
+
+        os.fsync = counting_fsync
+
+    def tearDown(self):
+        os.fsync = self._fsync
+        shutil.rmtree(self.directory)
+
+    def _segment_count(self):
+        return len(os.listdir(self.directory))
+
+    def _open_journal(self):
+        journal = record_journal.RecordJournal(self.path, sync_interval=60)
+        return journal, journal.replay()
+
+    def test_steady_load_keeps_journal_small(self):
+        journal, _ = self._open_journal()
+        # There is always an uncommitted record: each type commits a record
+        # only after the next one has been journaled.
+        for i in range(1000):
+            journal.append(TemperatureRecord(i, 20.0))
+            journal.append(HumidityRecord(i, 50.0))
+            if i:
+                journal.acknowledge(1, TemperatureRecord)
+                journal.acknowledge(1, HumidityRecord)
+            self.assertLessEqual(self._segment_count(), 3)
+        # At most one fsync per commit, not one per record.
+        self.assertLessEqual(self.fsync_count, 1000)
+        journal.close()
+
+    def test_replay_returns_only_uncommitted_records(self):
+        journal, _ = self._open_journal()
+        journal.append(TemperatureRecord(0, 20.0))
+        journal.append(HumidityRecord(0, 50.0))
+        journal.append(TemperatureRecord(1, 21.0))
+        journal.acknowledge(1, TemperatureRecord)
+        journal.append(HumidityRecord(1, 51.0))
+        journal.acknowledge(1, HumidityRecord)
+        journal.close()
+
+        journal, records = self._open_journal()
+        # Segments are replayed whole, so the committed readings that share a
+        # segment with the uncommitted second temperature reading come back
+        # too.
+        self.assertEqual([
+            TemperatureRecord(0, 20.0),
+            HumidityRecord(0, 50.0),
+            TemperatureRecord(1, 21.0),
+            HumidityRecord(1, 51.0),
+        ], records)
+        for record in records:
+            journal.acknowledge(1, type(record))
+        journal.close()
+
+        journal, records = self._open_journal()
+        self.assertEqual([], records)
+        journal.close()
+        self.assertEqual(0, self._segment_count())
+
+    def test_torn_entry_is_discarded(self):
+        journal, _ = self._open_journal()
+        journal.append(TemperatureRecord(0, 20.0))
+        journal.append(TemperatureRecord(1, 21.0))
+        journal.close()
+        segment_path = os.path.join(self.directory,
+                                    os.listdir(self.directory)[0])
+        with open(segment_path, 'r+b') as segment_file:
+            segment_file.truncate(os.path.getsize(segment_path) - 1)
+
+        journal, records = self._open_journal()
+        self.assertEqual([TemperatureRecord(0, 20.0)], records)
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,15 @@
+import collections
+import logging
 import Queue
+import threading
 
-import gpi.Gardenpi.db_store as db_store
+logger = logging.getLogger(__name__)
+
+# Number of seconds run() blocks waiting for a record before it checks whether
+# it has been stopped or a group commit is due.
+_DEFAULT_WAIT_SECONDS = 1.0
+# Maximum number of records run() drains from the queue in a single pass.
+_DEFAULT_MAX_BATCH_SIZE = 500
 
 
 class Error(Exception):
@@ -14,14 +23,32 @@ class UnsupportedRecordError(Error):
 class RecordProcessor(object):
     """Stores records from a queue into database stores."""
 
-    def __init__(self, record_queue, soil_moisture_store, light_store,
-                 humidity_store, temperature_store, watering_event_store):
+    def __init__(self, record_queue, record_stores, idle_task=None):
+        """Creates a new RecordProcessor.
+        Args:
+            record_queue: Queue from which to read records.
+            record_stores: A dict that maps each supported record type to the
+                store that holds records of that type. Each store's commit
+                policy acts as the batching policy for its record type.
+            idle_task: Optional function to call whenever the queue is found
+                empty, for small pieces of database maintenance. It runs on
+                the processor's thread, so it must return quickly.
+        """
         self._record_queue = record_queue
-        self._soil_moisture_store = soil_moisture_store
-        self._light_store = light_store
-        self._humidity_store = humidity_store
-        self._temperature_store = temperature_store
-        self._watering_event_store = watering_event_store
+        self._idle_task = idle_task
+        self._record_stores = dict(record_stores)
+        # Each store once, even if it holds several record types.
+        self._stores = []
+        for store in self._record_stores.values():
+            if store not in self._stores:
+                self._stores.append(store)
+        self._stop_event = threading.Event()
+        self._processed_count = 0
+
+    @property
+    def processed_count(self):
+        """Total number of records placed in a store."""
+        return self._processed_count
 
     def try_process_next_record(self):
         """Processes the next record from the queue, placing it in a store.
@@ -39,19 +66,99 @@ class RecordProcessor(object):
         try:
             record = self._record_queue.get_nowait()
         except Queue.Empty:
+            self._on_idle()
             return False
 
-        if isinstance(record, db_store.SoilMoistureRecord):
-            self._soil_moisture_store.insert(record)
-        elif isinstance(record, db_store.LightRecord):
-            self._light_store.insert(record)
-        elif isinstance(record, db_store.HumidityRecord):
-            self._humidity_store.insert(record)
-        elif isinstance(record, db_store.TemperatureRecord):
-            self._temperature_store.insert(record)
-        elif isinstance(record, db_store.WateringEventRecord):
-            self._watering_event_store.insert(record)
-        else:
+        self._store_for(record).insert(record)
+        self._processed_count += 1
+        return True
+
+    def run(self, wait_seconds=_DEFAULT_WAIT_SECONDS,
+            max_batch_size=_DEFAULT_MAX_BATCH_SIZE):
+        """Stores records from the queue until stop() is called.
+        Blocks until a record is available, then drains every record already
+        waiting in the queue and hands them to the stores as one batch. Pending
+        rows are flushed before returning. Must be called from the same thread
+        from which the database connections were created.
+        Args:
+            wait_seconds: Maximum number of seconds to block waiting for a
+                record before checking for a stop request or a due commit.
+            max_batch_size: Maximum number of records to store in one batch.
+        Raises:
+            UnsupportedRecordError if the queue contains an unexpected record
+                type.
+        """
+        try:
+            while not self._stop_event.is_set():
+                self.process_available_records(wait_seconds, max_batch_size)
+        finally:
+            self.flush()
+
+    def stop(self):
+        """Asks run() to return. Safe to call from any thread."""
+        self._stop_event.set()
+
+    def process_available_records(self, wait_seconds,
+                                  max_batch_size=_DEFAULT_MAX_BATCH_SIZE):
+        """Stores every record currently available in the queue.
+        Args:
+            wait_seconds: Maximum number of seconds to block waiting for the
+                first record.
+            max_batch_size: Maximum number of records to store in one batch.
+        Returns:
+            The number of records stored.
+        Raises:
+            UnsupportedRecordError if the queue contains an unexpected record
+                type.
+        """
+        try:
+            batch = [self._record_queue.get(timeout=wait_seconds)]
+        except Queue.Empty:
+            self._on_idle()
+            return 0
+        while len(batch) < max_batch_size:
+            try:
+                batch.append(self._record_queue.get_nowait())
+            except Queue.Empty:
+                break
+
+        # Each store receives its share of the batch in a single insert_many
+        # call, so a batch costs at most one commit per store.
+        records_by_store = collections.OrderedDict()
+        for record in batch:
+            records_by_store.setdefault(self._store_for(record),
+                                        []).append(record)
+        for store, records in records_by_store.items():
+            store.insert_many(records)
+        self._processed_count += len(batch)
+        self._commit_if_due()
+        logger.debug('stored batch of %d record(s)', len(batch))
+        return len(batch)
+
+    def flush(self):
+        """Commits all rows the stores are still holding in open transactions.
+        Must be called before the database connection is closed.
+        """
+        for store in self._stores:
+            store.flush()
+
+    def _store_for(self, record):
+        """Returns the store that holds records of the given record's type.
+        Raises:
+            UnsupportedRecordError if the record has an unexpected type.
+        """
+        try:
+            return self._record_stores[type(record)]
+        except KeyError:
             raise UnsupportedRecordError(
                 'Unrecognized record type: %s' % str(record))
-        return True
\ No newline at end of file
+
+    def _on_idle(self):
+        self._commit_if_due()
+        if self._idle_task:
+            self._idle_task()
+
+    def _commit_if_due(self):
+        """Commits rows whose group-commit interval has elapsed."""
+        for store in self._stores:
+            store.commit_if_due()
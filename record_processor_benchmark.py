@@ -0,0 +1,101 @@
+"""Measures the per-record cost of routing records to their stores.
+
+Compares RecordProcessor's type-keyed registry lookup with the isinstance
+chain it replaced. Usage:
+
+    python record_processor_benchmark.py [--records N] [--repeat R]
+"""
+
+import argparse
+import collections
+import timeit
+
+import record_processor
+
+_SENSOR_FIELDS = ['soil_moisture', 'light', 'humidity', 'temperature',
+                  'water_released']
+_RECORD_TYPES = [
+    collections.namedtuple('BenchmarkRecord%d' % i, ['timestamp', field])
+    for i, field in enumerate(_SENSOR_FIELDS)
+]
+
+
+class _NullStore(object):
+    """Store that discards everything it is given."""
+
+    def insert(self, record):
+        pass
+
+    def insert_many(self, records):
+        pass
+
+    def commit_if_due(self):
+        return False
+
+    def flush(self):
+        pass
+
+
+def _make_records(count):
+    return [
+        _RECORD_TYPES[i % len(_RECORD_TYPES)](i, float(i))
+        for i in range(count)
+    ]
+
+
+def _make_isinstance_chain(stores):
+    """Returns a dispatch function equivalent to the old isinstance chain."""
+    (soil_moisture_type, light_type, humidity_type, temperature_type,
+     watering_event_type) = _RECORD_TYPES
+
+    def store_for(record):
+        if isinstance(record, soil_moisture_type):
+            return stores[soil_moisture_type]
+        elif isinstance(record, light_type):
+            return stores[light_type]
+        elif isinstance(record, humidity_type):
+            return stores[humidity_type]
+        elif isinstance(record, temperature_type):
+            return stores[temperature_type]
+        elif isinstance(record, watering_event_type):
+            return stores[watering_event_type]
+        raise record_processor.UnsupportedRecordError(str(record))
+
+    return store_for
+
+
+def _best_ns_per_record(dispatch, records, repeat):
+    timings = timeit.repeat(
+        lambda: [dispatch(record) for record in records],
+        repeat=repeat,
+        number=1)
+    return min(timings) / len(records) * 1e9
+
+
+def main(args):
+    stores = {record_type: _NullStore() for record_type in _RECORD_TYPES}
+    processor = record_processor.RecordProcessor(None, stores)
+    records = _make_records(args.records)
+
+    registry_ns = _best_ns_per_record(processor._store_for, records,
+                                      args.repeat)
+    chain_ns = _best_ns_per_record(
+        _make_isinstance_chain(stores), records, args.repeat)
+
+    print('records per run:     %d' % len(records))
+    print('registry lookup:     %.1f ns/record' % registry_ns)
+    print('isinstance chain:    %.1f ns/record' % chain_ns)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='record_processor_benchmark',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        '--records',
+        type=int,
+        help='Number of records to dispatch per run',
+        default=100000)
+    parser.add_argument(
+        '--repeat', type=int, help='Number of timed runs', default=5)
+    main(parser.parse_args())
@@ -0,0 +1,108 @@
+"""Deletes expired rows from gardenpi's tables in small increments."""
+
+import calendar
+import collections
+import datetime
+import logging
+
+import clock
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of rows to delete per step.
+_DEFAULT_CHUNK_SIZE = 500
+# Maximum number of free pages to return to the filesystem per step.
+_DEFAULT_VACUUM_PAGES = 64
+# How long to wait after a full pass over every table finds nothing to delete.
+_DEFAULT_CHECK_INTERVAL = datetime.timedelta(minutes=10)
+
+# table is the name of a table with an epoch-seconds timestamp column; rows
+# whose timestamp is older than max_age (a timedelta) are deleted.
+RetentionPolicy = collections.namedtuple('RetentionPolicy',
+                                         ['table', 'max_age'])
+
+
+class RetentionEngine(object):
+    """Applies retention policies a small chunk of rows at a time.
+    Each call to run_step() deletes at most chunk_size expired rows from a
+    single table, commits if it deleted any, and returns up to vacuum_pages
+    free pages to the filesystem. The work is spread out so it never holds the
+    database long enough to delay inserts. Free pages are only returned to the
+    filesystem in databases created with auto_vacuum=INCREMENTAL. Other
+    databases reuse the freed pages for new rows, so the file stops growing
+    without an offline VACUUM.
+    """
+
+    def __init__(self, connection, policies, utc_clock=None,
+                 chunk_size=_DEFAULT_CHUNK_SIZE,
+                 vacuum_pages=_DEFAULT_VACUUM_PAGES,
+                 check_interval=_DEFAULT_CHECK_INTERVAL, before_commit=None):
+        """Creates a new RetentionEngine.
+        Args:
+            connection: firebase database connection.
+            policies: A list of RetentionPolicy objects.
+            utc_clock: Clock interface used to compute expiry cutoffs.
+                Defaults to a UTC clock.
+            chunk_size: Maximum number of rows to delete per step.
+            vacuum_pages: Maximum number of free pages to release per step.
+            check_interval: How long to wait after a full pass over every
+                table finds nothing to delete.
+            before_commit: Function to call before committing deleted rows,
+                or None. When the connection is shared with group-committing
+                stores, it must flush them, so that their rows are committed
+                by the stores and their commit listeners hear about it.
+        """
+        self._connection = connection
+        self._cursor = connection.cursor()
+        self._policies = list(policies)
+        self._clock = utc_clock or clock.Clock()
+        self._chunk_size = chunk_size
+        self._vacuum_pages = vacuum_pages
+        self._idle_timer = clock.Timer(self._clock, check_interval)
+        self._idle_timer.set_remaining(datetime.timedelta(seconds=0))
+        self._before_commit = before_commit
+        self._next_policy = 0
+        self._idle_policies = 0
+
+    def run_step(self):
+        """Deletes one chunk of expired rows, if any are due.
+        Returns:
+            The number of rows deleted.
+        """
+        if not self._policies or not self._idle_timer.expired():
+            return 0
+        policy = self._policies[self._next_policy]
+        self._next_policy = (self._next_policy + 1) % len(self._policies)
+
+        cutoff = calendar.timegm(
+            (self._clock.now() - policy.max_age).utctimetuple())
+        # Looks before deleting, so that a table with nothing expired never
+        # opens a write transaction on the shared connection.
+        self._cursor.execute(
+            'SELECT 1 FROM %s WHERE timestamp < ? LIMIT 1' % policy.table,
+            (cutoff,))
+        if self._cursor.fetchone() is None:
+            self._idle_policies += 1
+            if self._idle_policies >= len(self._policies):
+                # Nothing is expired anywhere, so rest before checking again.
+                self._idle_policies = 0
+                self._idle_timer.reset()
+            return 0
+
+        self._cursor.execute(
+            'DELETE FROM %s WHERE rowid IN '
+            '(SELECT rowid FROM %s WHERE timestamp < ? '
+            'ORDER BY timestamp LIMIT ?)' % (policy.table, policy.table),
+            (cutoff, self._chunk_size))
+        deleted = self._cursor.rowcount
+        if self._before_commit:
+            self._before_commit()
+        self._connection.commit()
+
+        self._idle_policies = 0
+        self._cursor.execute('PRAGMA incremental_vacuum(%d)' %
+                             self._vacuum_pages)
+        self._cursor.fetchall()
+        logger.info('deleted %d expired row(s) from %s', deleted,
+                    policy.table)
+        return deleted
@@ -0,0 +1,68 @@
+import datetime
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import pytz
+
+import firebasedb
+import retention
+import storage_backend
+
+
+class RetentionEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, 'gardenpi.db')
+        self.backend = storage_backend.SqliteBackend()
+        self.connection = firebasedb.open_or_create_db(self.db_path,
+                                                       self.backend)
+        self.store = firebasedb.TemperatureStore(self.connection,
+                                                 commit_batch_size=100)
+        self.committed = []
+        self.store.add_commit_listener(self.committed.append)
+        self.engine = retention.RetentionEngine(
+            self.connection,
+            [retention.RetentionPolicy('temperature',
+                                       datetime.timedelta(days=7))],
+            before_commit=self.store.flush)
+        self.now = datetime.datetime.now(tz=pytz.utc)
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.directory)
+
+    def _committed_temperatures(self):
+        connection = sqlite3.connect(self.db_path)
+        try:
+            return [row[0] for row in connection.execute(
+                'SELECT temperature FROM temperature ORDER BY timestamp')]
+        finally:
+            connection.close()
+
+    def test_deletion_commits_pending_rows_through_their_store(self):
+        self.store.insert(firebasedb.TemperatureRecord(
+            self.now - datetime.timedelta(days=30), 10.0))
+        self.store.flush()
+        self.store.insert(firebasedb.TemperatureRecord(self.now, 20.0))
+
+        self.assertEqual(1, self.engine.run_step())
+        self.assertEqual([20.0], self._committed_temperatures())
+        # The store heard about the commit of its pending row, exactly once.
+        self.assertEqual([1, 1], self.committed)
+        self.store.flush()
+        self.assertEqual([1, 1], self.committed)
+
+    def test_nothing_expired_commits_nothing(self):
+        self.store.insert(firebasedb.TemperatureRecord(self.now, 20.0))
+
+        self.assertEqual(0, self.engine.run_step())
+        self.assertEqual([], self._committed_temperatures())
+        self.assertEqual([], self.committed)
+
+
+if __name__ == '__main__':
+    unittest.main()
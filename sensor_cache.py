@@ -0,0 +1,90 @@
+import logging
+import threading
+
+import clock
+
+logger = logging.getLogger(__name__)
+
+
+class _CachedReading(object):
+    """A read-through cache of one reading function, with single flight.
+    While a read is in progress, other callers wait for it and share its
+    result instead of starting reads of their own.
+    """
+
+    def __init__(self, read_function, ttl, utc_clock):
+        self._read_function = read_function
+        self._ttl = ttl
+        self._clock = utc_clock
+        self._condition = threading.Condition(threading.Lock())
+        self._value = None
+        self._read_time = None
+        self._in_flight = False
+        # Each read gets a number, so waiters can tell whether the read they
+        # waited on is the one that failed.
+        self._flight = 0
+        self._failed_flight = None
+        self._error = None
+
+    def __call__(self):
+        with self._condition:
+            if (self._read_time is not None and
+                    self._clock.now() - self._read_time < self._ttl):
+                return self._value
+            if self._in_flight:
+                flight = self._flight
+                while self._in_flight:
+                    self._condition.wait()
+                if self._failed_flight == flight:
+                    raise self._error
+                return self._value
+            self._in_flight = True
+            self._flight += 1
+            flight = self._flight
+        try:
+            value = self._read_function()
+        except Exception as e:
+            with self._condition:
+                self._in_flight = False
+                self._failed_flight = flight
+                self._error = e
+                self._condition.notify_all()
+            raise
+        with self._condition:
+            self._value = value
+            self._read_time = self._clock.now()
+            self._in_flight = False
+            self._condition.notify_all()
+        return value
+
+
+class CachedSensor(object):
+    """Read-through cache in front of a sensor wrapper.
+    The sensor's reading methods return a cached value for ttl after each
+    hardware read, and concurrent calls that miss the cache share a single
+    read. Every other attribute is passed through to the sensor, so a
+    CachedSensor can stand in wherever the sensor is used.
+    """
+
+    def __init__(self, sensor, reading_methods, ttl, utc_clock=None):
+        """Creates a new CachedSensor.
+        Args:
+            sensor: Sensor wrapper to cache, such as a SoilMoistureSensor.
+            reading_methods: Names of the sensor's methods that take no
+                arguments and return a reading, such as ['soil_moisture'].
+            ttl: How long (as a timedelta) a reading stays fresh.
+            utc_clock: Clock interface used to age readings. Defaults to a
+                UTC clock.
+        """
+        self._sensor = sensor
+        utc_clock = utc_clock or clock.Clock()
+        self._cached_readings = dict(
+            (name, _CachedReading(getattr(sensor, name), ttl, utc_clock))
+            for name in reading_methods)
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the CachedSensor itself.
+        cached_reading = self.__dict__.get('_cached_readings', {}).get(name)
+        if cached_reading:
+            return cached_reading
+        return getattr(self._sensor, name)
@@ -1,12 +1,39 @@
+import array
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Maximum value the light sensor's ADC channel can report.
+_LIGHT_SENSOR_MAX_VALUE = 1023.0
+
+# Ways to combine oversampled soil moisture readings into one value.
+MEDIAN = 'median'
+TRIMMED_MEAN = 'trimmed_mean'
+# Fraction of the samples dropped from each end before a trimmed mean.
+_DEFAULT_TRIM_FRACTION = 0.2
+
+
+def _median(samples):
+    ordered = sorted(samples)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2.0
+
+
+def _trimmed_mean(samples, trim_fraction):
+    ordered = sorted(samples)
+    trim = int(len(ordered) * trim_fraction)
+    kept = ordered[trim:len(ordered) - trim]
+    return sum(kept) / float(len(kept))
+
 
 class SoilMoistureSensor(object):
     """Wrapper for a moisture sensor."""
 
-    def __init__(self, adc, pi_io, channel, gpio_pin):
+    def __init__(self, adc, pi_io, channel, gpio_pin, samples=1,
+                 sample_filter=MEDIAN, trim_fraction=_DEFAULT_TRIM_FRACTION,
+                 settle_seconds=0.0):
         """Creates a new SoilMoistureSensor instance.
         Args:
             adc: ADC(analog to digital) interface to receive analog signals from
@@ -16,21 +43,158 @@ class SoilMoistureSensor(object):
                 be an int between 0 and 7.
             gpio_pin: The Raspberry Pi GPIO pin that the moisture sensor is
                 connected to. Must be an int between 2 and 27.
+            samples: Number of ADC samples to take per reading, all while the
+                sensor is powered on once.
+            sample_filter: MEDIAN or TRIMMED_MEAN, how to combine the samples
+                into one reading.
+            trim_fraction: Fraction of the samples to drop from each end for
+                TRIMMED_MEAN. Must be at least 0 and less than 0.5, and must
+                leave at least one of the samples.
+            settle_seconds: Number of seconds to wait after powering the
+                sensor on before sampling it.
+        Raises:
+            ValueError if samples, sample_filter or trim_fraction is invalid.
         """
+        if samples < 1:
+            raise ValueError('samples must be positive: %d' % samples)
+        if sample_filter not in (MEDIAN, TRIMMED_MEAN):
+            raise ValueError('Invalid sample filter: %s' % sample_filter)
+        if not 0 <= trim_fraction < 0.5:
+            raise ValueError(
+                'trim_fraction must be at least 0 and less than 0.5: %f' %
+                trim_fraction)
+        if int(samples * trim_fraction) * 2 >= samples:
+            raise ValueError('trim_fraction %f trims all %d samples' %
+                             (trim_fraction, samples))
         self._adc = adc
         self._pi_io = pi_io
         self._channel = channel
         self._gpio_pin = gpio_pin
+        self._sample_channels = [channel] * samples
+        self._sample_filter = sample_filter
+        self._trim_fraction = trim_fraction
+        self._settle_seconds = settle_seconds
+
+    def power_session(self):
+        """Returns a context manager that keeps the sensor powered on.
+        Readings taken inside the session reuse its power-on window and settle
+        time instead of each cycling the GPIO pin. Probes that share a power
+        pin share sessions, so a batch of reads across them switches the rail
+        on and off once:
+
+            with probe_a.power_session(), probe_b.power_session():
+                readings = [probe_a.soil_moisture(), probe_b.soil_moisture()]
+        """
+        return self._pi_io.power_session(self._gpio_pin, self._settle_seconds)
 
     def soil_moisture(self):
         """Returns the soil moisture level.
         Takes a reading from the moisture sensor by powering the GPIO pin the
-        sensor is connected to.
-        """
-        try:
-            self._pi_io.turn_pin_on(self._gpio_pin)
-            moisture = self._adc.read_adc(self._channel)
-            logger.info('soil moisture reading = %d', moisture)
-            return moisture
-        finally:
-            self._pi_io.turn_pin_off(self._gpio_pin)
\ No newline at end of file
+        sensor is connected to, unless a power session already holds the pin
+        on. When oversampling, every sample is taken in
+        the same burst and power-on window, and the samples are combined with
+        the sensor's filter so that a single noisy sample cannot trigger a
+        watering.
+        """
+        with self.power_session():
+            # Always a new read: a cached burst may predate the power-on. A
+            # shared burst also samples the other sensors on this ADC.
+            samples = array.array(
+                'd', self._adc.read_many(self._sample_channels))
+        if len(samples) == 1:
+            moisture = int(samples[0])
+        elif self._sample_filter == MEDIAN:
+            moisture = int(round(_median(samples)))
+        else:
+            moisture = int(round(_trimmed_mean(samples, self._trim_fraction)))
+        logger.info('soil moisture reading = %d (from %d sample(s))', moisture,
+                    len(samples))
+        return moisture
+
+
+class LightSensor(object):
+    """Wrapper for a light sensor."""
+
+    def __init__(self, adc, channel):
+        """Creates a new LightSensor instance.
+        Args:
+            adc: ADC(analog to digital) interface to receive analog signals from
+                light sensor.
+            channel: ADC channel to which the light sensor is connected. Must
+                be an int between 0 and 7.
+        """
+        self._adc = adc
+        self._channel = channel
+
+    def light(self):
+        """Returns the light level as a percentage of the sensor's range.
+        Reuses the value from a recent burst read of the ADC, if the ADC
+        shares bursts between sensors.
+        """
+        light = self._adc.read_adc(self._channel)
+        light_pct = (light / _LIGHT_SENSOR_MAX_VALUE) * 100.0
+        logger.info('light reading = %.1f%%', light_pct)
+        return light_pct
+
+
+class Dht11(object):
+    """Wrapper for a DHT11 temperature and humidity sensor."""
+
+    def __init__(self, dht_driver, gpio_pin):
+        """Creates a new Dht11 instance.
+        Args:
+            dht_driver: DHT driver interface, such as the Adafruit_DHT module.
+            gpio_pin: Raspberry Pi pin to which the sensor's data line is
+                connected.
+        """
+        self._dht_driver = dht_driver
+        self._gpio_pin = gpio_pin
+
+    def read(self):
+        """Reads the sensor.
+        Returns:
+            A (humidity, temperature) tuple, with humidity in percent and
+            temperature in degrees Celsius.
+        Raises:
+            IOError: The sensor did not return a reading.
+        """
+        humidity, temperature = self._dht_driver.read_retry(
+            self._dht_driver.DHT11, self._gpio_pin)
+        if humidity is None or temperature is None:
+            raise IOError('Failed to read DHT11 on GPIO pin %d' %
+                          self._gpio_pin)
+        return humidity, temperature
+
+
+class TemperatureSensor(object):
+    """Wrapper for the temperature half of a DHT11."""
+
+    def __init__(self, dht11):
+        """Creates a new TemperatureSensor instance.
+        Args:
+            dht11: Dht11 interface to read.
+        """
+        self._dht11 = dht11
+
+    def temperature(self):
+        """Returns the temperature in degrees Celsius."""
+        _, temperature = self._dht11.read()
+        logger.info('temperature reading = %.1f C', temperature)
+        return temperature
+
+
+class HumiditySensor(object):
+    """Wrapper for the humidity half of a DHT11."""
+
+    def __init__(self, dht11):
+        """Creates a new HumiditySensor instance.
+        Args:
+            dht11: Dht11 interface to read.
+        """
+        self._dht11 = dht11
+
+    def humidity(self):
+        """Returns the relative humidity in percent."""
+        humidity, _ = self._dht11.read()
+        logger.info('humidity reading = %.1f%%', humidity)
+        return humidity
@@ -0,0 +1,24 @@
+import unittest
+
+import sensors
+
+
+class SoilMoistureSensorTest(unittest.TestCase):
+
+    def _make_sensor(self, samples, trim_fraction):
+        return sensors.SoilMoistureSensor(
+            None, None, channel=0, gpio_pin=2, samples=samples,
+            sample_filter=sensors.TRIMMED_MEAN, trim_fraction=trim_fraction)
+
+    def test_trim_fraction_must_leave_a_sample(self):
+        for samples, trim_fraction in ((2, 0.5), (5, -0.1), (5, 0.7)):
+            with self.assertRaises(ValueError):
+                self._make_sensor(samples, trim_fraction)
+
+    def test_valid_trim_fraction_is_accepted(self):
+        for samples, trim_fraction in ((1, 0.0), (2, 0.49), (5, 0.2)):
+            self._make_sensor(samples, trim_fraction)
+
+
+if __name__ == '__main__':
+    unittest.main()
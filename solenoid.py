@@ -39,7 +39,7 @@ class solenoid(object):
             logger.info('turning solenoid on (with GPIO pin %d)', self._solenoid_pin)
             self._pi_io.turn_pin_on(self._solenoid_pin)
 
-            wait_time_seconds = amount_ms / _solenoid_RATE_ms
+            wait_time_seconds = amount_ms / _solenoid_RATE_MS_PER_SEC
             self._clock.wait(wait_time_seconds)
 
             logger.info('turning solenoid off (with GPIO pin %d)', self._solenoid_pin)
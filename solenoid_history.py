@@ -122,4 +122,18 @@ class solenoidScheduler(object):
                 if sleep_time <= current_time < wake_time:
                     return False
 
-        return True
\ No newline at end of file
+        return True
+
+
+def last_solenoid_time(watering_event_store):
+    """Returns the time of the most recent watering.
+    Args:
+        watering_event_store: Store of watering events.
+    Returns:
+        A datetime of the most recent watering event, or None if the solenoid
+        has never run.
+    """
+    latest_event = watering_event_store.latest()
+    if latest_event is None:
+        return None
+    return latest_event.timestamp
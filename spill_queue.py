@@ -0,0 +1,176 @@
+import collections
+import logging
+import pickle
+import Queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SpillingQueue(object):
+    """A bounded FIFO queue that spills overflow to an append-only file.
+    At most capacity items are held in memory. Once the queue is full, new
+    items are appended to a spill file on disk instead, and put() never blocks
+    the producer. When the consumer has emptied the in-memory queue, spilled
+    items are replayed from the file in the order they were written, so the
+    queue as a whole stays strictly FIFO. Items left in the spill file when
+    the process exits are replayed on the next run; this is at-least-once, so
+    items replayed shortly before an exit may be replayed again.
+    Items must be picklable. The queue is safe to use from multiple threads.
+    """
+
+    def __init__(self, capacity, spill_path):
+        """Creates a new SpillingQueue.
+        Args:
+            capacity: Maximum number of items to hold in memory.
+            spill_path: Path to the file in which to store overflow items.
+        """
+        if capacity < 1:
+            raise ValueError('capacity must be positive: %d' % capacity)
+        self._capacity = capacity
+        self._items = collections.deque()
+        self._not_empty = threading.Condition(threading.Lock())
+        self._spill_path = spill_path
+        self._spill_writer = open(spill_path, 'ab')
+        self._spill_reader = open(spill_path, 'rb')
+        self._spill_backlog = self._recover_spill_file()
+        self._spilled_count = 0
+        self._replayed_count = 0
+        if self._spill_backlog:
+            logger.info('found %d spilled record(s) from a previous run',
+                        self._spill_backlog)
+
+    @property
+    def spilled_count(self):
+        """Total number of items written to the spill file."""
+        return self._spilled_count
+
+    @property
+    def replayed_count(self):
+        """Total number of items read back from the spill file."""
+        return self._replayed_count
+
+    def qsize(self):
+        """Returns the number of items in memory and in the spill file."""
+        with self._not_empty:
+            return len(self._items) + self._spill_backlog
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def put(self, item, block=True, timeout=None):
+        """Adds an item to the queue, spilling it to disk if memory is full.
+        Never blocks; block and timeout are accepted for compatibility with
+        Queue.Queue.
+        """
+        with self._not_empty:
+            # Once anything has spilled, later items must spill too so that
+            # they cannot overtake the spilled ones.
+            if self._spill_backlog or len(self._items) >= self._capacity:
+                self._spill(item)
+            else:
+                self._items.append(item)
+            self._not_empty.notify()
+
+    def put_nowait(self, item):
+        self.put(item)
+
+    def get(self, block=True, timeout=None):
+        """Removes and returns the oldest item in the queue.
+        Args:
+            block: If False, raises Queue.Empty immediately if no item is
+                available.
+            timeout: Maximum number of seconds to block, or None to block
+                until an item is available.
+        Raises:
+            Queue.Empty if no item became available.
+        """
+        with self._not_empty:
+            if not block:
+                if not self._has_items():
+                    raise Queue.Empty
+            elif timeout is None:
+                while not self._has_items():
+                    self._not_empty.wait()
+            else:
+                deadline = time.time() + timeout
+                while not self._has_items():
+                    remaining = deadline - time.time()
+                    if remaining <= 0.0:
+                        raise Queue.Empty
+                    self._not_empty.wait(remaining)
+            if not self._items:
+                self._replay()
+            return self._items.popleft()
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def clear(self):
+        """Discards every item in the queue, including the spill file."""
+        with self._not_empty:
+            self._items.clear()
+            self._spill_backlog = 0
+            self._truncate_spill_file(0)
+
+    def close(self):
+        """Closes the spill file. Items still in memory are discarded."""
+        with self._not_empty:
+            self._spill_writer.close()
+            self._spill_reader.close()
+
+    def _has_items(self):
+        return bool(self._items) or self._spill_backlog > 0
+
+    def _spill(self, item):
+        if not self._spill_backlog:
+            logger.warning(
+                'record queue is full (%d items), spilling records to disk',
+                self._capacity)
+        pickle.dump(item, self._spill_writer, pickle.HIGHEST_PROTOCOL)
+        self._spill_writer.flush()
+        self._spill_backlog += 1
+        self._spilled_count += 1
+
+    def _replay(self):
+        """Moves up to capacity items from the spill file into memory."""
+        while self._spill_backlog and len(self._items) < self._capacity:
+            self._items.append(pickle.load(self._spill_reader))
+            self._spill_backlog -= 1
+            self._replayed_count += 1
+        if not self._spill_backlog:
+            # Everything on disk has been replayed, so start the file over.
+            self._truncate_spill_file(0)
+            logger.info('replayed all spilled records')
+
+    def _recover_spill_file(self):
+        """Counts the items left in the spill file by a previous run.
+        Discards a partially written item at the end of the file, if any.
+        Returns:
+            The number of complete items in the spill file.
+        """
+        count = 0
+        good_offset = 0
+        while True:
+            try:
+                pickle.load(self._spill_reader)
+            except EOFError:
+                break
+            except Exception:
+                logger.warning('discarding truncated record at end of spill '
+                               'file (offset %d)', good_offset)
+                break
+            count += 1
+            good_offset = self._spill_reader.tell()
+        self._truncate_spill_file(good_offset)
+        return count
+
+    def _truncate_spill_file(self, size):
+        """Cuts the spill file to size bytes and rewinds the reader.
+        The reader is reopened rather than rewound with seek(), which on
+        Python 2 can keep serving bytes it buffered before the truncate.
+        """
+        self._spill_writer.truncate(size)
+        self._spill_reader.close()
+        self._spill_reader = open(self._spill_path, 'rb')
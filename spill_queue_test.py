@@ -0,0 +1,66 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import spill_queue
+
+
+class SpillingQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'spill.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_spill_drain_spill_stays_fifo(self):
+        queue = spill_queue.SpillingQueue(3, self.path)
+        for i in range(8):
+            queue.put(i)
+        self.assertEqual(list(range(8)),
+                         [queue.get_nowait() for _ in range(8)])
+        # The spill file was truncated when it drained; items spilled after
+        # that must not be mixed with the ones read before it.
+        for i in range(8, 16):
+            queue.put(i)
+        self.assertEqual(list(range(8, 16)),
+                         [queue.get_nowait() for _ in range(8)])
+        self.assertTrue(queue.empty())
+        queue.close()
+
+    def test_random_puts_and_gets_stay_fifo(self):
+        for seed in range(20):
+            generator = random.Random(seed)
+            queue = spill_queue.SpillingQueue(3, self.path)
+            queue.clear()
+            expected = []
+            received = []
+            for i in range(200):
+                if generator.random() < 0.55:
+                    queue.put(i)
+                    expected.append(i)
+                elif not queue.empty():
+                    received.append(queue.get_nowait())
+            while not queue.empty():
+                received.append(queue.get_nowait())
+            queue.close()
+            self.assertEqual(expected, received, 'seed %d' % seed)
+
+    def test_clear_then_spill(self):
+        queue = spill_queue.SpillingQueue(2, self.path)
+        for i in range(6):
+            queue.put(i)
+        self.assertEqual(0, queue.get_nowait())
+        queue.clear()
+        for i in range(6, 12):
+            queue.put(i)
+        self.assertEqual(list(range(6, 12)),
+                         [queue.get_nowait() for _ in range(6)])
+        queue.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
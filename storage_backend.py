@@ -0,0 +1,103 @@
+"""Storage engines that hold the gardenpi database.
+
+A backend opens DB-API connections for the database stores. The stores only
+rely on the DB-API (cursor, execute, executemany, fetchmany, commit) and
+SQLite's SQL dialect.
+"""
+
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# Number of compiled statements each connection keeps cached. The stores
+# issue a fixed set of SQL strings, so this is enough for all of them to stay
+# prepared.
+_DEFAULT_CACHED_STATEMENTS = 256
+# Number of seconds a connection waits for another connection's write lock
+# before failing.
+DEFAULT_BUSY_TIMEOUT_SECONDS = 5.0
+
+_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+class Backend(object):
+    """Interface for a storage engine that holds the gardenpi database."""
+
+    def exists(self, db_path):
+        """Returns True if a database already exists at db_path."""
+        raise NotImplementedError()
+
+    def connect(self, db_path):
+        """Opens a connection to the database at db_path.
+        Returns:
+            A DB-API connection. The caller is responsible for closing it.
+        """
+        raise NotImplementedError()
+
+
+class SqliteBackend(Backend):
+    """A local SQLite database file in write-ahead-log (WAL) mode.
+    In WAL mode readers see a consistent snapshot without taking the write
+    lock, so reads on other connections never block the writer and the writer
+    never blocks them. Commits append to the WAL instead of rewriting pages in
+    place, which keeps writes sequential on flash storage.
+    """
+
+    def __init__(self, synchronous='FULL',
+                 cached_statements=_DEFAULT_CACHED_STATEMENTS,
+                 busy_timeout=DEFAULT_BUSY_TIMEOUT_SECONDS):
+        """Creates a new SqliteBackend.
+        Args:
+            synchronous: SQLite synchronous setting (OFF, NORMAL, FULL or
+                EXTRA). In WAL mode FULL costs one fsync of the WAL per commit
+                and makes every commit durable, which the record journal
+                relies on before it discards records. NORMAL skips that fsync
+                and can lose the last commits on power loss.
+            cached_statements: Number of compiled statements to keep cached
+                per connection.
+            busy_timeout: Number of seconds to wait for a write lock held by
+                another connection.
+        """
+        synchronous = synchronous.upper()
+        if synchronous not in _SYNCHRONOUS_MODES:
+            raise ValueError('Invalid synchronous setting: %s' % synchronous)
+        self._synchronous = synchronous
+        self._cached_statements = cached_statements
+        self._busy_timeout = busy_timeout
+
+    def exists(self, db_path):
+        return os.path.exists(db_path)
+
+    def connect(self, db_path):
+        connection = sqlite3.connect(db_path,
+                                     timeout=self._busy_timeout,
+                                     cached_statements=self._cached_statements)
+        cursor = connection.cursor()
+        # Lets retention return freed pages to the filesystem a few at a time.
+        # This only takes effect on a new, empty database file, so it must
+        # come before anything (including the WAL switch) writes to the file.
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('PRAGMA journal_mode = WAL')
+        journal_mode = cursor.fetchone()[0]
+        if journal_mode.upper() != 'WAL':
+            logger.warning('could not enable WAL mode on "%s" (mode is %s)',
+                           db_path, journal_mode)
+        cursor.execute('PRAGMA synchronous = %s' % self._synchronous)
+        cursor.close()
+        return connection
+
+
+class MemoryBackend(Backend):
+    """A private in-memory SQLite database, for tests.
+    Every connection gets a fresh, empty database that disappears when the
+    connection closes.
+    """
+
+    def exists(self, db_path):
+        return False
+
+    def connect(self, db_path):
+        return sqlite3.connect(':memory:',
+                               cached_statements=_DEFAULT_CACHED_STATEMENTS)
@@ -0,0 +1,209 @@
+"""Persistent FIFO of cloud writes waiting to be uploaded."""
+
+import collections
+import itertools
+import logging
+import os
+import pickle
+import struct
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Each entry is a header followed by a pickled write. The header holds the
+# payload length and the CRC-32 of the payload, both big-endian uint32.
+_HEADER = struct.Struct('>II')
+# Default cap on the size of the queue file, in bytes.
+_DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+# When the queue is full, the oldest writes are dropped until the file is at
+# most this fraction of its cap, so that the rewrite is not repeated for every
+# new write.
+_FULL_DROP_TARGET = 0.75
+# The file is rewritten without its uploaded entries once they take up more
+# than this many bytes and more than half of the file.
+_COMPACT_MIN_BYTES = 64 * 1024
+
+
+def _checksum(payload):
+    return zlib.crc32(payload) & 0xffffffff
+
+
+def _encode(write):
+    payload = pickle.dumps(write, pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(len(payload), _checksum(payload)) + payload
+
+
+class UploadQueue(object):
+    """A FIFO of cloud writes that survives restarts and network outages.
+    Writes are appended to a file as well as held in memory, and are removed
+    only once they have been uploaded, so writes made while the uplink is down
+    are uploaded when it returns, even across a restart. The file is capped at
+    max_bytes; when a new write would exceed the cap, the oldest writes that
+    are not in flight are dropped until the queue is at three quarters of it.
+    Uploaded writes are cut from the file in bulk rather than one by one, and
+    on close(). After a crash, writes uploaded since the last cut are queued
+    again, so uploads must be idempotent.
+    Each write is a dict that maps database paths to values, and is given a
+    sequence number when it is queued. The queue is safe to use from multiple
+    threads.
+    """
+
+    def __init__(self, path, max_bytes=_DEFAULT_MAX_BYTES):
+        """Creates a new UploadQueue.
+        Args:
+            path: Path to the queue file. Created if it does not exist; writes
+                left in it by a previous run are queued again.
+            max_bytes: Maximum size of the queue file, in bytes.
+        """
+        self._path = path
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Each item is a (sequence number, write, encoded size) tuple.
+        self._entries = collections.deque()
+        self._sequence = itertools.count()
+        # Sequence number of the newest write peek() has returned. Writes up
+        # to it may be in flight, so they are never dropped to make room.
+        self._peeked_through = -1
+        self._size = 0
+        self._consumed_bytes = 0
+        self._dropped_count = 0
+        self._load()
+        self._file = open(path, 'ab')
+        if self._entries:
+            logger.info('found %d queued cloud write(s) from a previous run',
+                        len(self._entries))
+
+    @property
+    def dropped_count(self):
+        """Total number of writes dropped to stay under the size cap."""
+        return self._dropped_count
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def append(self, write):
+        """Adds a write to the end of the queue.
+        Args:
+            write: A dict that maps database paths to picklable values.
+        """
+        entry = _encode(write)
+        with self._lock:
+            if self._size + len(entry) > self._max_bytes:
+                self._make_room(len(entry))
+            self._file.write(entry)
+            self._file.flush()
+            self._size += len(entry)
+            self._entries.append((next(self._sequence), write, len(entry)))
+
+    def peek(self, count):
+        """Returns up to count writes from the front of the queue, in order.
+        Returns:
+            A list of (sequence number, write) tuples.
+        """
+        with self._lock:
+            writes = [(sequence, write) for sequence, write, _ in
+                      itertools.islice(self._entries, count)]
+            if writes:
+                self._peeked_through = max(self._peeked_through,
+                                           writes[-1][0])
+            return writes
+
+    def remove(self, through_sequence):
+        """Removes writes from the front of the queue once they are uploaded.
+        Args:
+            through_sequence: Sequence number of the last uploaded write. It
+                and every write queued before it are removed.
+        """
+        with self._lock:
+            while self._entries and self._entries[0][0] <= through_sequence:
+                _, _, entry_size = self._entries.popleft()
+                self._consumed_bytes += entry_size
+            if not self._entries:
+                self._truncate()
+            elif (self._consumed_bytes > _COMPACT_MIN_BYTES and
+                  self._consumed_bytes * 2 > self._size):
+                self._compact()
+
+    def close(self):
+        """Cuts uploaded writes from the file and closes it."""
+        with self._lock:
+            if self._consumed_bytes:
+                self._compact()
+            self._file.close()
+
+    def _make_room(self, entry_size):
+        """Drops the oldest writes so that entry_size more bytes fit the cap.
+        Writes that peek() has returned may be in flight, so they are kept;
+        if they alone overflow the cap, the file stays over it until they
+        are removed.
+        """
+        target_bytes = self._max_bytes * _FULL_DROP_TARGET
+        queued_bytes = self._size - self._consumed_bytes
+        kept = collections.deque()
+        dropped = 0
+        for entry in self._entries:
+            sequence, _, dropped_size = entry
+            if (sequence > self._peeked_through and
+                    queued_bytes + entry_size > target_bytes):
+                self._consumed_bytes += dropped_size
+                queued_bytes -= dropped_size
+                dropped += 1
+            else:
+                kept.append(entry)
+        self._entries = kept
+        if dropped:
+            self._dropped_count += dropped
+            logger.warning('upload queue is full (%d bytes), dropped %d '
+                           'oldest write(s)', self._max_bytes, dropped)
+        self._compact()
+
+    def _truncate(self):
+        self._file.truncate(0)
+        self._size = 0
+        self._consumed_bytes = 0
+
+    def _compact(self):
+        """Rewrites the file with only the writes still in the queue."""
+        temp_path = self._path + '.tmp'
+        with open(temp_path, 'wb') as temp_file:
+            for _, write, _ in self._entries:
+                temp_file.write(_encode(write))
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        self._file.close()
+        os.rename(temp_path, self._path)
+        self._file = open(self._path, 'ab')
+        self._size = sum(entry_size for _, _, entry_size in self._entries)
+        self._consumed_bytes = 0
+
+    def _load(self):
+        """Reads the writes a previous run left in the file.
+        Discards a torn entry at the end of the file, along with anything
+        after it.
+        """
+        if not os.path.exists(self._path):
+            return
+        good_offset = 0
+        with open(self._path, 'rb') as queue_file:
+            while True:
+                header = queue_file.read(_HEADER.size)
+                if not header:
+                    break
+                if len(header) == _HEADER.size:
+                    length, checksum = _HEADER.unpack(header)
+                    payload = queue_file.read(length)
+                    if (len(payload) == length and
+                            _checksum(payload) == checksum):
+                        self._entries.append((next(self._sequence),
+                                              pickle.loads(payload),
+                                              _HEADER.size + length))
+                        good_offset = queue_file.tell()
+                        continue
+                logger.warning('discarding corrupt upload queue entry at '
+                               'offset %d', good_offset)
+                break
+        with open(self._path, 'r+b') as queue_file:
+            queue_file.truncate(good_offset)
+        self._size = good_offset
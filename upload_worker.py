@@ -0,0 +1,263 @@
+"""Uploads values to Firebase on a background thread."""
+
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+
+import firebase_rest
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of database paths to write in a single request.
+_DEFAULT_BATCH_SIZE = 500
+# Number of seconds to wait before retrying after the first failed upload.
+_DEFAULT_MIN_BACKOFF_SECONDS = 1.0
+# Maximum number of seconds to wait between retries.
+_DEFAULT_MAX_BACKOFF_SECONDS = 300.0
+# HTTP status with which Firebase rejects a malformed write. Resending the
+# same write can never succeed.
+_BAD_REQUEST = 400
+
+
+def _conflicts(path, paths, ancestors):
+    """Returns True if path cannot share a multi-path update with paths.
+    Firebase rejects an update in which one path is an ancestor of another.
+    Args:
+        path: Database path to add to the update.
+        paths: Set of paths already in the update.
+        ancestors: Set of every proper ancestor of the paths in the update.
+    """
+    if path in ancestors:
+        return True
+    parts = path.split('/')
+    return any('/'.join(parts[:i]) in paths for i in range(1, len(parts)))
+
+
+def _encodes(update):
+    """Returns True if json can encode update, as the client must to send it.
+    """
+    try:
+        json.dumps(update)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _add_ancestors(path, ancestors):
+    parts = path.split('/')
+    for i in range(1, len(parts)):
+        ancestors.add('/'.join(parts[:i]))
+
+
+class UploadWorker(object):
+    """Sends Firebase writes from a persistent queue on its own thread.
+    post(), patch() and put() only append the write to an UploadQueue and
+    return immediately, so callers on the sensor and record paths never wait
+    on the network, and writes made while the uplink is down are kept until
+    it returns.
+    The worker coalesces pending writes into as few multi-path PATCH requests
+    as it can, so a backlog built up over an outage goes out in a few large
+    requests. Posts are given client-generated keys, which makes every
+    request safe to resend. After a failed request the worker retries with
+    exponential backoff and random jitter.
+    """
+
+    def __init__(self, client, upload_queue, batch_size=_DEFAULT_BATCH_SIZE,
+                 min_backoff=_DEFAULT_MIN_BACKOFF_SECONDS,
+                 max_backoff=_DEFAULT_MAX_BACKOFF_SECONDS):
+        """Creates a new UploadWorker.
+        Args:
+            client: firebase_rest.FirebaseClient to send writes with.
+            upload_queue: UploadQueue in which to keep writes until they are
+                sent.
+            batch_size: Maximum number of database paths to write per request.
+            min_backoff: Number of seconds to wait after the first failure.
+            max_backoff: Maximum number of seconds to wait between retries.
+        """
+        self._client = client
+        self._upload_queue = upload_queue
+        self._batch_size = batch_size
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+        self._wake = threading.Condition(threading.Lock())
+        self._stopped = False
+        self._thread = None
+        self._key_sequence = itertools.count()
+        self._in_flight = 0
+        self._uploaded_count = 0
+        self._failed_count = 0
+        self._rejected_count = 0
+
+    @property
+    def queue_depth(self):
+        """Number of writes waiting to be sent."""
+        return len(self._upload_queue)
+
+    @property
+    def in_flight(self):
+        """Number of writes in the request currently being sent."""
+        return self._in_flight
+
+    @property
+    def uploaded_count(self):
+        """Total number of writes the server accepted."""
+        return self._uploaded_count
+
+    @property
+    def failed_count(self):
+        """Total number of requests that failed and were retried."""
+        return self._failed_count
+
+    @property
+    def dropped_count(self):
+        """Total number of writes dropped, either to keep the queue under its
+        size cap or because they were malformed and could never be sent.
+        """
+        return self._upload_queue.dropped_count + self._rejected_count
+
+    def post(self, path, value):
+        """Queues a value to append under a path with a new unique key."""
+        self._submit({'%s/%s' % (path.strip('/'), self._new_key()): value})
+
+    def patch(self, path, values):
+        """Queues an update of several children of a path."""
+        path = path.strip('/')
+        self._submit(dict(('%s/%s' % (path, child), value)
+                          for child, value in values.items()))
+
+    def put(self, path, value):
+        """Queues a replacement of the value at a path."""
+        self._submit({path.strip('/'): value})
+
+    def start_async(self):
+        """Starts sending queued writes on a background thread."""
+        self._thread = threading.Thread(target=self._run, name='upload-worker')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """Stops the thread once the current request, if any, has finished.
+        Closes the upload queue. Writes still queued stay in its file for the
+        next run.
+        """
+        with self._wake:
+            self._stopped = True
+            self._wake.notify()
+        if self._thread:
+            self._thread.join()
+        self._upload_queue.close()
+
+    def _new_key(self):
+        """Returns a unique key that sorts in the order keys were made."""
+        return '%013d-%06d' % (int(time.time() * 1000),
+                               next(self._key_sequence) % 1000000)
+
+    def _submit(self, write):
+        if not write:
+            return
+        self._upload_queue.append(write)
+        with self._wake:
+            self._wake.notify()
+
+    def _next_batch(self):
+        """Coalesces writes from the front of the queue into one update.
+        Returns:
+            A (number of writes, sequence number of the last write, update
+            dict) tuple. The update is empty if the queue is empty.
+        """
+        update = {}
+        ancestors = set()
+        write_count = 0
+        last_sequence = None
+        for sequence, write in self._upload_queue.peek(self._batch_size):
+            if update and (len(update) + len(write) > self._batch_size or
+                           any(_conflicts(path, update, ancestors)
+                               for path in write)):
+                break
+            for path in write:
+                # A later write to the same path supersedes the earlier one.
+                update[path] = write[path]
+                _add_ancestors(path, ancestors)
+            write_count += 1
+            last_sequence = sequence
+        return write_count, last_sequence, update
+
+    def _wait_for_writes(self):
+        """Waits until a write is queued or close() is called.
+        Returns:
+            True if close() was called.
+        """
+        with self._wake:
+            while not self._stopped and not len(self._upload_queue):
+                self._wake.wait()
+            return self._stopped
+
+    def _sleep(self, seconds):
+        """Waits out a backoff. New writes do not cut it short.
+        Returns:
+            True if close() was called.
+        """
+        deadline = time.time() + seconds
+        with self._wake:
+            while not self._stopped:
+                remaining = deadline - time.time()
+                if remaining <= 0.0:
+                    break
+                self._wake.wait(remaining)
+            return self._stopped
+
+    def _run(self):
+        failures = 0
+        while True:
+            write_count, last_sequence, update = self._next_batch()
+            if not update:
+                if self._wait_for_writes():
+                    return
+                continue
+            self._in_flight = len(update)
+            error = None
+            unsendable = False
+            try:
+                self._client.patch('', update)
+            except firebase_rest.RequestError as e:
+                error = e
+                unsendable = e.status == _BAD_REQUEST
+            except Exception as e:
+                # Anything else, such as a malformed response body, must not
+                # kill the thread and leave writes piling up in the queue.
+                logger.exception('cloud upload of %d write(s) failed '
+                                 'unexpectedly', write_count)
+                error = e
+                # A value json cannot encode fails the same way every time.
+                unsendable = not _encodes(update)
+            self._in_flight = 0
+
+            if error is None or unsendable:
+                if error is None:
+                    self._uploaded_count += write_count
+                else:
+                    self._rejected_count += write_count
+                    logger.error('%d write(s) can never be sent, dropping '
+                                 'them: %s', write_count, error)
+                self._upload_queue.remove(last_sequence)
+                failures = 0
+                with self._wake:
+                    if self._stopped:
+                        return
+                continue
+
+            self._failed_count += 1
+            failures += 1
+            backoff = min(self._max_backoff,
+                          self._min_backoff * 2 ** (failures - 1))
+            # Jitter spreads retries out so they do not all land at once
+            # when the uplink returns.
+            backoff *= random.uniform(0.5, 1.0)
+            logger.warning('cloud upload failed (attempt %d), retrying in '
+                           '%.1f s (%d write(s) queued): %s', failures,
+                           backoff, self.queue_depth, error)
+            if self._sleep(backoff):
+                return
@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import upload_queue
+import upload_worker
+
+
+class _BlockingClient(object):
+    """Client that records what it sends and holds its first request open."""
+
+    def __init__(self):
+        self.sent = []
+        self.first_request_started = threading.Event()
+        self.release_first_request = threading.Event()
+        self._lock = threading.Lock()
+
+    def patch(self, path, update):
+        self.first_request_started.set()
+        self.release_first_request.wait()
+        with self._lock:
+            self.sent.extend(update)
+
+
+class _FlakyClient(object):
+    """Client that encodes updates as the real one does, and raises
+    ValueError for the first failure_count requests.
+    """
+
+    def __init__(self, failure_count):
+        self.sent = []
+        self._failure_count = failure_count
+
+    def patch(self, path, update):
+        json.dumps(update)
+        if self._failure_count:
+            self._failure_count -= 1
+            raise ValueError('malformed response body')
+        self.sent.extend(update)
+
+
+class UploadQueueOverflowTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'upload_queue.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_remove_keeps_writes_queued_after_the_batch(self):
+        queue = upload_queue.UploadQueue(self.path)
+        for i in range(3):
+            queue.append({'a/%03d' % i: i})
+        batch = queue.peek(2)
+        queue.append({'a/003': 3})
+        queue.remove(batch[-1][0])
+        self.assertEqual([{'a/002': 2}, {'a/003': 3}],
+                         [write for _, write in queue.peek(10)])
+        queue.close()
+
+    def test_make_room_keeps_peeked_writes(self):
+        write_size = len(upload_queue._encode({'a/000': 0}))
+        queue = upload_queue.UploadQueue(self.path, max_bytes=10 * write_size)
+        for i in range(10):
+            queue.append({'a/%03d' % i: i})
+        peeked = queue.peek(5)
+        queue.append({'a/010': 10})
+        remaining = [write for _, write in queue.peek(20)]
+        for _, write in peeked:
+            self.assertIn(write, remaining)
+        self.assertIn({'a/010': 10}, remaining)
+        self.assertEqual(11 - len(remaining), queue.dropped_count)
+        queue.close()
+
+    def test_overflow_during_upload_loses_no_uncounted_write(self):
+        write_size = len(upload_queue._encode({'a/000': 0}))
+        queue = upload_queue.UploadQueue(self.path, max_bytes=20 * write_size)
+        client = _BlockingClient()
+        worker = upload_worker.UploadWorker(client, queue, batch_size=5)
+        for i in range(5):
+            worker.put('a/%03d' % i, i)
+        worker.start_async()
+        self.assertTrue(client.first_request_started.wait(5.0))
+        # Overflows the queue while the first batch is in flight.
+        for i in range(5, 77):
+            worker.put('a/%03d' % i, i)
+        # The oldest writes still queued are the ones in flight, so removing
+        # them once they are sent cannot remove anything else.
+        self.assertEqual([{'a/%03d' % i: i} for i in range(5)],
+                         [write for _, write in queue.peek(5)])
+        client.release_first_request.set()
+        for _ in range(500):
+            if not worker.queue_depth:
+                break
+            threading.Event().wait(0.01)
+        worker.close()
+
+        self.assertEqual(0, worker.queue_depth)
+        self.assertEqual(len(client.sent), len(set(client.sent)))
+        # The in-flight batch was sent and is not counted as dropped.
+        for i in range(5):
+            self.assertIn('a/%03d' % i, client.sent)
+        self.assertEqual(77, len(client.sent) + worker.dropped_count)
+        self.assertEqual(len(client.sent), worker.uploaded_count)
+
+
+class UnexpectedErrorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queue = upload_queue.UploadQueue(
+            os.path.join(self.directory, 'upload_queue.dat'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _run_until_drained(self, worker):
+        worker.start_async()
+        for _ in range(500):
+            if not worker.queue_depth:
+                break
+            threading.Event().wait(0.01)
+        worker.close()
+
+    def test_unexpected_error_is_retried(self):
+        client = _FlakyClient(failure_count=1)
+        worker = upload_worker.UploadWorker(client, self.queue,
+                                            min_backoff=0.01)
+        worker.put('a/000', 0)
+        self._run_until_drained(worker)
+
+        self.assertEqual(['a/000'], client.sent)
+        self.assertEqual(1, worker.failed_count)
+        self.assertEqual(1, worker.uploaded_count)
+
+    def test_unencodable_write_is_dropped(self):
+        client = _FlakyClient(failure_count=0)
+        worker = upload_worker.UploadWorker(client, self.queue, batch_size=1,
+                                            min_backoff=0.01)
+        worker.put('a/000', set([0]))
+        worker.put('a/001', 1)
+        self._run_until_drained(worker)
+
+        self.assertEqual(['a/001'], client.sent)
+        self.assertEqual(1, worker.dropped_count)
+        self.assertEqual(0, worker.failed_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import collections
+import logging
+
+try:
+    import ConfigParser as configparser
+except ImportError:
+    import configparser
+
+logger = logging.getLogger(__name__)
+
+# Raspberry Pi GPIO pins (BCM numbering) the gardenpi hardware is wired to.
+GpioPins = collections.namedtuple('GpioPins', [
+    'soil_moisture', 'solenoid', 'dht11', 'mcp3008_clk', 'mcp3008_dout',
+    'mcp3008_din', 'mcp3008_cs_shdn'
+])
+# MCP3008 channels the analog sensors are wired to.
+AdcChannels = collections.namedtuple('AdcChannels',
+                                     ['soil_moisture_sensor', 'light_sensor'])
+# relay_pins maps each input pin to the output pin that follows its level.
+# extra_output_pins are output pins nothing else drives, which are held low.
+WiringConfig = collections.namedtuple(
+    'WiringConfig',
+    ['gpio_pins', 'adc_channels', 'relay_pins', 'extra_output_pins'])
+
+_GPIO_PINS_SECTION = 'gpio_pins'
+_ADC_CHANNELS_SECTION = 'adc_channels'
+_RELAY_PINS_SECTION = 'relay_pins'
+_EXTRA_PINS_SECTION = 'extra_pins'
+_EXTRA_OUTPUTS_OPTION = 'outputs'
+_ADC_CHANNEL_COUNT = 8
+_MAX_GPIO_PIN = 27
+
+
+class Error(Exception):
+    pass
+
+
+class MissingOptionError(Error):
+    pass
+
+
+class InvalidValueError(Error):
+    pass
+
+
+class DuplicateValueError(Error):
+    pass
+
+
+def _parse_int(section, option, raw_value, minimum, maximum):
+    try:
+        value = int(raw_value)
+    except ValueError:
+        raise InvalidValueError('Expected an integer for [%s] %s, got %s' %
+                                (section, option, raw_value))
+    if not minimum <= value <= maximum:
+        raise InvalidValueError('[%s] %s must be between %d and %d, got %d' %
+                                (section, option, minimum, maximum, value))
+    return value
+
+
+def _read_int(parser, section, option, minimum, maximum):
+    try:
+        raw_value = parser.get(section, option)
+    except (configparser.NoSectionError, configparser.NoOptionError):
+        raise MissingOptionError('Missing config option: [%s] %s' %
+                                 (section, option))
+    return _parse_int(section, option, raw_value, minimum, maximum)
+
+
+def _read_relay_pins(parser):
+    """Reads the optional relay section, which maps input to output pins."""
+    if not parser.has_section(_RELAY_PINS_SECTION):
+        return {}
+    relay_pins = {}
+    for option, raw_value in parser.items(_RELAY_PINS_SECTION):
+        input_pin = _parse_int(_RELAY_PINS_SECTION, option, option, 0,
+                               _MAX_GPIO_PIN)
+        relay_pins[input_pin] = _parse_int(_RELAY_PINS_SECTION, option,
+                                           raw_value, 0, _MAX_GPIO_PIN)
+    return relay_pins
+
+
+def _read_extra_output_pins(parser):
+    if not parser.has_option(_EXTRA_PINS_SECTION, _EXTRA_OUTPUTS_OPTION):
+        return ()
+    raw_values = parser.get(_EXTRA_PINS_SECTION, _EXTRA_OUTPUTS_OPTION)
+    return tuple(
+        _parse_int(_EXTRA_PINS_SECTION, _EXTRA_OUTPUTS_OPTION,
+                   raw_value.strip(), 0, _MAX_GPIO_PIN)
+        for raw_value in raw_values.split(',') if raw_value.strip())
+
+
+def _check_pins_unique(pins):
+    seen = set()
+    for pin in pins:
+        if pin in seen:
+            raise DuplicateValueError('GPIO pin %d is wired to more than one '
+                                      'thing' % pin)
+        seen.add(pin)
+
+
+def _read_section(parser, section, fields, minimum, maximum):
+    values = [_read_int(parser, section, field, minimum, maximum)
+              for field in fields]
+    for field, value in zip(fields, values):
+        if values.count(value) > 1:
+            raise DuplicateValueError('[%s] %s shares value %d with another '
+                                      'option' % (section, field, value))
+    return values
+
+
+def parse(config_file):
+    """Parses a wiring config.
+    Args:
+        config_file: File object holding the wiring config, in INI format.
+    Returns:
+        A WiringConfig instance.
+    Raises:
+        Error: The config is incomplete or holds invalid values.
+    """
+    parser = configparser.RawConfigParser()
+    if hasattr(parser, 'read_file'):
+        parser.read_file(config_file)
+    else:
+        parser.readfp(config_file)
+    gpio_pins = GpioPins(*_read_section(parser, _GPIO_PINS_SECTION,
+                                        GpioPins._fields, 0, _MAX_GPIO_PIN))
+    adc_channels = AdcChannels(*_read_section(
+        parser, _ADC_CHANNELS_SECTION, AdcChannels._fields, 0,
+        _ADC_CHANNEL_COUNT - 1))
+    relay_pins = _read_relay_pins(parser)
+    extra_output_pins = _read_extra_output_pins(parser)
+    _check_pins_unique(
+        list(gpio_pins) + list(relay_pins.keys()) + list(relay_pins.values()) +
+        list(extra_output_pins))
+    return WiringConfig(gpio_pins, adc_channels, relay_pins,
+                        extra_output_pins)